@@ -1,10 +1,105 @@
 # backend/app/config.py
+from functools import lru_cache
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     FIREBASE_CREDENTIALS: str = "firebase.json"
+    # read from the credentials file when empty
+    FIREBASE_PROJECT_ID: str = ""
+    TOKEN_CACHE_SIZE: int = 10000
+    # an unknown key id fetches Google's certificates at most this often
+    # (seconds); routine refreshes happen in the background
+    FIREBASE_REFETCH_INTERVAL: float = 60.0
     STORAGE_PATH: str = "./data/storage"
     CORS_ORIGINS: str = "*"
+    # SQLite (app/deps.py). Several uvicorn workers may share one database:
+    # writes are serialised by a lock file next to it and small metadata
+    # writes are grouped into one transaction per GROUP_COMMIT_WINDOW.
+    # Multi-worker search needs QDRANT_URL; embedded Qdrant is single-process
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 30
+    DB_BUSY_TIMEOUT: float = 30.0
+    DB_SYNCHRONOUS: str = "NORMAL"
+    GROUP_COMMIT_WINDOW: float = 0.002
+    GROUP_COMMIT_MAX: int = 64
+    # legacy JSON store, imported into SQLite on first startup
+    LEGACY_DATA_FILE: str = "handout_data.json"
+    # uploads are streamed in chunks of this size and rejected past the cap
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    MAX_UPLOAD_SIZE: int = 256 * 1024 * 1024
+    # resumable upload sessions (routers/uploads.py)
+    UPLOAD_PART_SIZE: int = 8 * 1024 * 1024
+    UPLOAD_SESSION_TTL: int = 24 * 3600
+    # "full" keeps every version as uploaded; "compact" lets the rebalance
+    # pass store older versions as bsdiff deltas or zlib (blob_service)
+    STORAGE_MODE: str = "full"
+    REBALANCE_INTERVAL: float = 6 * 3600.0
+    REBALANCE_MIN_SAVING: float = 0.1
+    REBALANCE_HOT_READS: int = 100
+    DELTA_MAX_CHAIN: int = 4
+    # bsdiff holds base, target and patch in memory to encode and to read
+    # back, so blobs larger than this are only ever zlib compressed
+    DELTA_MAX_SIZE: int = 32 * 1024 * 1024
+    # reconstructed copies of encoded blobs are kept this long after last use
+    MATERIALIZED_TTL: int = 3600
+    # bulk imports (POST /handouts/bulk): whole request and file count caps
+    MAX_BULK_SIZE: int = 2 * 1024 * 1024 * 1024
+    BULK_MAX_FILES: int = 1000
+    # total bytes a bulk ZIP may unpack to (compression can be ~1000:1)
+    BULK_MAX_EXTRACTED: int = 4 * 1024 * 1024 * 1024
+    # downloads: hand file bodies to nginx (internal location mapped to
+    # STORAGE_PATH) instead of streaming them from Python
+    ACCEL_REDIRECT_PREFIX: str = ""
+    # download/preview counters are buffered and written this often
+    STATS_FLUSH_INTERVAL: float = 5.0
+    # semantic search (services/search_service.py); empty QDRANT_URL keeps
+    # an embedded Qdrant under STORAGE_PATH/qdrant
+    EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBED_BATCH_SIZE: int = 64
+    SEARCH_CHUNK_CHARS: int = 800
+    # matching chunks looked at per handout when picking the hit to show
+    SEARCH_GROUP_SIZE: int = 8
+    QDRANT_URL: str = ""
+    # background ingestion (services/ingest_worker.py). 0 runs the heavy
+    # stage in threads of the API process instead: fine for tests, not for
+    # serving, since extraction / embedding then holds the GIL and uploads
+    # slow down with it (record_upload went from ~10 ms to 20-126 ms)
+    INGEST_WORKERS: int = 2
+    JOB_BATCH_SIZE: int = 8
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_BASE: float = 10.0
+    JOB_POLL_INTERVAL: float = 2.0
+    JOB_STALE_SECONDS: int = 1800
+    # page thumbnails / first-page previews (services/thumbnail_service.py)
+    THUMBNAIL_PAGES: int = 8
+    THUMBNAIL_WIDTH: int = 240
+    PREVIEW_WIDTH: int = 1024
+    THUMBNAIL_QUALITY: int = 80
+    THUMB_MEMORY_BYTES: int = 64 * 1024 * 1024
+    THUMB_DISK_BYTES: int = 2 * 1024 * 1024 * 1024
+    # in-memory subject / handout / version metadata and listing
+    # responses (services/metadata_cache.py)
+    METADATA_CACHE_BYTES: int = 32 * 1024 * 1024
+    # invalidation counters shared by all workers; subjects hash into these
+    METADATA_GENERATION_SLOTS: int = 4096
+    # comma separated subsystems to load right after startup instead of on
+    # first use: embeddings, qdrant, firebase
+    WARMUP: str = ""
+    # signed ?expires=&sig= URLs for previews and thumbnails
+    # (utils/signed_url.py); empty key: a random one kept in STORAGE_PATH
+    MEDIA_URL_KEY: str = ""
+    MEDIA_URL_TTL: int = 900
+    # GET /metrics (Prometheus text); set a token to require
+    # "Authorization: Bearer <token>" from the scraper
+    METRICS_TOKEN: str = ""
+    # honour "X-Profile: 1" and return a timing trace for that request
+    PROFILING: bool = False
 
     class Config:
         env_file = ".env"
+
+
+@lru_cache
+def get_settings():
+    # one parse of env / .env per process
+    return Settings()
@@ -1,15 +1,162 @@
 # backend/app/deps.py
 import os
-from sqlmodel import create_engine, Session
-from app.config import Settings
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import lru_cache
+from sqlalchemy import event
+from sqlmodel import create_engine, Session, SQLModel
+from app.config import get_settings
+from app.utils.startup_report import timed
+from app.utils.file_lock import FileLock
+from app.utils import metrics
 
-settings = Settings()
+settings = get_settings()
 
 DB_PATH = os.path.abspath("data/db.sqlite")
-os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
-engine = create_engine(f"sqlite:///{DB_PATH}", connect_args={"check_same_thread": False})
+# SQLite allows a single writer; serialise them here, across threads and
+# across uvicorn workers, instead of letting concurrent uploads race into
+# "database is locked"
+write_lock = FileLock(DB_PATH + ".write-lock")
+
+def _tune(dbapi_conn, _):
+    # WAL: readers never block the writer and vice versa; NORMAL only
+    # syncs at checkpoints, which WAL makes safe against corruption
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute(f"PRAGMA synchronous={settings.DB_SYNCHRONOUS}")
+    cur.execute(f"PRAGMA busy_timeout={int(settings.DB_BUSY_TIMEOUT * 1000)}")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.close()
+
+def _begin(conn):
+    # with the driver's own transaction handling off (isolation_level=None)
+    # every transaction starts here; pysqlite would send no BEGIN before a
+    # SAVEPOINT, so each RELEASE of a group commit would commit by itself
+    conn.exec_driver_sql("BEGIN")
+
+@lru_cache
+def get_engine():
+    # created on first use so importing the app touches no files
+    with timed("db.engine"):
+        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+        engine = create_engine(
+            f"sqlite:///{DB_PATH}",
+            connect_args={
+                "check_same_thread": False,
+                "timeout": settings.DB_BUSY_TIMEOUT,
+                "isolation_level": None,
+            },
+            # one connection per request thread; beyond that, wait
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_BUSY_TIMEOUT,
+        )
+        event.listen(engine, "connect", _tune)
+        event.listen(engine, "begin", _begin)
+        return engine
+
+def init_db():
+    # make sure every model is registered before create_all
+    import app.models.init  # noqa: F401
+
+    # workers start together; only one may create the tables
+    with timed("db.create_all"), write_lock:
+        SQLModel.metadata.create_all(get_engine())
 
 def get_session():
-    with Session(engine) as s:
+    with Session(get_engine()) as s:
+        yield s
+
+@contextmanager
+def read_session():
+    with Session(get_engine()) as s:
         yield s
+
+# called with the session after its transaction has really committed,
+# still under write_lock; the Session "after_commit" event also fires
+# for every savepoint, which group commits use
+_on_commit = []
+
+def on_commit(fn):
+    _on_commit.append(fn)
+    return fn
+
+@contextmanager
+def write_session():
+    with metrics.timed("db.write_lock_wait"):
+        write_lock.acquire()
+    try:
+        with Session(get_engine()) as s:
+            yield s
+            with metrics.timed("db.commit"):
+                s.commit()
+            for fn in _on_commit:
+                fn(s)
+    finally:
+        write_lock.release()
+
+# ============================================================
+# GROUP COMMIT
+# ============================================================
+# Small metadata writes from concurrent requests (one upload = a handful
+# of rows) are queued and committed together: one lock round trip and one
+# transaction per batch instead of per request. Each write runs in its own
+# savepoint, so a failing one is reported to its caller alone.
+_commits = queue.Queue()
+_committer = None
+_committer_lock = threading.Lock()
+
+def _take_batch():
+    batch = [_commits.get()]
+    deadline = time.monotonic() + settings.GROUP_COMMIT_WINDOW
+    while len(batch) < settings.GROUP_COMMIT_MAX:
+        try:
+            # whatever queued up meanwhile, then a short wait for stragglers
+            batch.append(_commits.get(timeout=max(deadline - time.monotonic(), 0)))
+        except queue.Empty:
+            break
+    return batch
+
+def _commit_forever():
+    while True:
+        batch = _take_batch()
+        metrics.GROUP_COMMIT_SIZE.observe(len(batch))
+        done = []
+        try:
+            with write_session() as s:
+                for fn, fut in batch:
+                    try:
+                        with s.begin_nested():
+                            done.append((fut, fn(s), None))
+                    except Exception as e:
+                        done.append((fut, None, e))
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            continue
+        for fut, result, error in done:
+            if error is not None:
+                fut.set_exception(error)
+            else:
+                fut.set_result(result)
+
+def grouped_write(fn):
+    """Run fn(session) in the next group commit and return its result.
+
+    fn must return plain values, not ORM objects: the session is closed
+    by the time the caller sees the result. Blocks; call it from a
+    worker thread, like write_session().
+    """
+    global _committer
+    if _committer is None:
+        with _committer_lock:
+            if _committer is None:
+                _committer = threading.Thread(target=_commit_forever, name="group-commit", daemon=True)
+                _committer.start()
+    fut = Future()
+    _commits.put((fn, fut))
+    return fut.result()
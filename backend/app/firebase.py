@@ -1,13 +1,184 @@
 # app/firebase.py
-import firebase_admin
-from firebase_admin import credentials, auth
-from app.config import Settings
+import re
+import json
+import time
+import asyncio
+import logging
+import threading
+import urllib.request
+from functools import lru_cache
+from app.config import get_settings
+from app.utils.startup_report import timed
+from app.utils.token_cache import TokenCache
+from app.utils import metrics
 
-settings = Settings()
-cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS)
-firebase_admin.initialize_app(cred)
+settings = get_settings()
+log = logging.getLogger(__name__)
 
+# Google's signing certificates for Firebase ID tokens
+CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
 
+# allow small clock skew so "token used too early" doesn't blow up
+CLOCK_SKEW = 300
+
+_app = None
+_lock = threading.Lock()
+
+_keys = {}
+_keys_expire = 0.0
+_keys_lock = threading.Lock()
+
+# on-demand fetches: when the last one started, and key ids it did not
+# have (so forged tokens cannot make every request call Google)
+_last_fetch = 0.0
+_unknown = {}
+_fetch_lock = threading.Lock()
+UNKNOWN_MAX = 10000
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+metrics.Gauge("auth_token_cache_hits", "Token verifications served from cache", fn=lambda: token_cache.hits)
+metrics.Gauge("auth_token_cache_misses", "Token verifications done in full", fn=lambda: token_cache.misses)
+
+
+def get_app():
+    # firebase_admin is slow to import and needs the credentials file, so
+    # neither happens until a token actually has to be verified
+    global _app
+    if _app is None:
+        with _lock:
+            if _app is None:
+                with timed("firebase.init"):
+                    import firebase_admin
+                    from firebase_admin import credentials
+
+                    cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS)
+                    _app = firebase_admin.initialize_app(cred)
+    return _app
+
+
+@lru_cache
+def project_id():
+    if settings.FIREBASE_PROJECT_ID:
+        return settings.FIREBASE_PROJECT_ID
+    try:
+        with open(settings.FIREBASE_CREDENTIALS, "r") as f:
+            return json.load(f).get("project_id") or None
+    except (OSError, ValueError):
+        return None
+
+
+# ============================================================
+# SIGNING KEYS
+# ============================================================
+def set_keys(keys: dict, expires_in: float = 3600):
+    """Install {kid: public key}; also how tests plug in their own keypair."""
+    global _keys, _keys_expire
+    with _keys_lock:
+        _keys = dict(keys)
+        _keys_expire = time.time() + expires_in
+        _unknown.clear()
+
+
+def fetch_keys():
+    from cryptography import x509
+
+    global _last_fetch
+    _last_fetch = time.time()
+
+    with timed("firebase.fetch_certs"), urllib.request.urlopen(CERTS_URL, timeout=10) as resp:
+        certs = json.load(resp)
+        m = re.search(r"max-age=(\d+)", resp.headers.get("Cache-Control", ""))
+
+    keys = {
+        kid: x509.load_pem_x509_certificate(pem.encode()).public_key()
+        for kid, pem in certs.items()
+    }
+    set_keys(keys, int(m.group(1)) if m else 3600)
+
+
+def _refetch():
+    # at most one fetch per FIREBASE_REFETCH_INTERVAL; callers that arrive
+    # while it runs wait for it instead of starting their own
+    with _fetch_lock:
+        if time.time() - _last_fetch < settings.FIREBASE_REFETCH_INTERVAL:
+            return
+        try:
+            fetch_keys()
+        except Exception:
+            log.exception("fetching Firebase signing certificates failed")
+
+
+def public_key(kid: str):
+    now = time.time()
+    key = _keys.get(kid)
+    if key is not None and now < _keys_expire:
+        return key
+    if key is None and now - _unknown.get(kid, 0) < settings.FIREBASE_REFETCH_INTERVAL:
+        return None
+
+    # unknown kid usually means Google rotated keys since our fetch; an
+    # expired set means the background refresher is behind. If the fetch
+    # is skipped or fails, the old set stays in use
+    _refetch()
+    key = _keys.get(kid)
+    if key is None:
+        if len(_unknown) >= UNKNOWN_MAX:
+            _unknown.clear()
+        _unknown[kid] = time.time()
+    return key
+
+
+async def refresh_keys_forever():
+    """Keep the certificates fresh so no request ever waits on Google."""
+    while True:
+        try:
+            await asyncio.to_thread(fetch_keys)
+            delay = max(_keys_expire - time.time() - 300, 60)
+        except Exception:
+            log.exception("fetching Firebase signing certificates failed")
+            delay = 60
+        await asyncio.sleep(delay)
+
+
+# ============================================================
+# VERIFICATION
+# ============================================================
+def verify_locally(token: str, project: str):
+    import jwt
+
+    header = jwt.get_unverified_header(token)
+    key = public_key(header.get("kid"))
+    if key is None:
+        raise jwt.InvalidTokenError("unknown signing key")
+
+    claims = jwt.decode(
+        token, key, algorithms=["RS256"],
+        audience=project, issuer=f"https://securetoken.google.com/{project}",
+        leeway=CLOCK_SKEW,
+    )
+    if not claims.get("sub"):
+        raise jwt.InvalidTokenError("missing subject")
+    claims.setdefault("uid", claims["sub"])
+    return claims
+
+
+@metrics.timed("auth.verify_token")
 def verify_token(token: str):
-    # allow small clock skew so "token used too early" doesn't blow up
-    return auth.verify_id_token(token, clock_skew_seconds=300)
+    """Verified claims for a Firebase ID token; raises if it is not valid.
+
+    A repeat token is a dictionary lookup; a new one is checked against
+    the prefetched Google certificates without any network round trip.
+    """
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+
+    project = project_id()
+    if project:
+        claims = verify_locally(token, project)
+    else:
+        from firebase_admin import auth
+        claims = auth.verify_id_token(token, app=get_app(), clock_skew_seconds=CLOCK_SKEW)
+
+    token_cache.put(token, claims)
+    return claims
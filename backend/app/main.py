@@ -1,12 +1,23 @@
 # app/main.py
-from fastapi import FastAPI
+from app.utils import startup_report
+
+# time everything imported from here on; see GET /debug/startup
+startup_report.install()
+
+import asyncio
+import logging
+from fastapi import FastAPI, Depends, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlmodel import SQLModel
-from app.deps import engine
-from app.routers import auth, handouts
-from app.config import Settings
+from app.deps import init_db, write_session
+from app.routers import auth, handouts, uploads
+from app.services import import_service, stats_service, search_service, ingest_worker, blob_service
+from app import firebase
+from app.config import get_settings
+from app.utils import metrics
 
-settings = Settings()
+settings = get_settings()
+log = logging.getLogger(__name__)
 
 app = FastAPI()
 
@@ -14,16 +25,90 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=[settings.CORS_ORIGINS],
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "X-Next-Cursor", "Server-Timing", "X-Profile-Id"],
 )
 
+# heavy subsystems load on first use; list them in WARMUP to pay the cost
+# right after startup instead of on the first request that needs them
+WARMUP_HOOKS = {
+    "embeddings": search_service.get_model,
+    "qdrant": search_service.get_client,
+    "firebase": firebase.get_app,
+}
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    # the multipart body is parsed before the endpoint runs, so refuse
+    # obviously oversized uploads from the header instead of spooling them
+    length = request.headers.get("content-length")
+    path = request.url.path
+    limit = settings.MAX_BULK_SIZE if path.endswith("/bulk") else settings.MAX_UPLOAD_SIZE
+    if path.endswith(("/upload", "/bulk")) and length and length.isdigit() \
+            and int(length) > limit + 64 * 1024:
+        return JSONResponse({"detail": "File too large"}, status_code=413)
+    return await call_next(request)
+
+# added last so it wraps everything else, including the 413s above
+app.add_middleware(metrics.MetricsMiddleware, profiling=settings.PROFILING)
+
 @app.on_event("startup")
 def init():
-    SQLModel.metadata.create_all(engine)
+    init_db()
+    # carry over anything still living in the old JSON store
+    with startup_report.timed("legacy_import"), write_session() as s:
+        import_service.import_if_empty(s, settings.LEGACY_DATA_FILE)
+
+def warm_up():
+    for name in filter(None, (n.strip() for n in settings.WARMUP.split(","))):
+        try:
+            WARMUP_HOOKS[name]()
+        except Exception:
+            log.exception("warm-up of %s failed", name)
+
+@app.on_event("startup")
+async def start_background_work():
+    app.state.stats_task = asyncio.create_task(stats_service.flush_forever())
+    await ingest_worker.start()
+    if settings.STORAGE_MODE == "compact":
+        app.state.rebalance_task = asyncio.create_task(blob_service.rebalance_forever())
+    if firebase.project_id():
+        app.state.certs_task = asyncio.create_task(firebase.refresh_keys_forever())
+    # warm-up runs in the background so it never delays readiness
+    app.state.warmup_task = asyncio.create_task(asyncio.to_thread(warm_up))
+
+    startup_report.mark_ready()
+    startup_report.uninstall()
+    log.info("startup report: %s", startup_report.report(top=10))
+
+@app.on_event("shutdown")
+async def stop_background_work():
+    app.state.stats_task.cancel()
+    await ingest_worker.stop()
+    await asyncio.to_thread(stats_service.flush)
+    search_service.close()
 
 app.include_router(auth.router)
 app.include_router(handouts.router)
+app.include_router(uploads.router)
 
 @app.get("/")
 def root():
     return {"status": "ok"}
+
+@app.get("/debug/startup")
+def startup(user=Depends(handouts.user)):
+    return startup_report.report()
+
+@app.get("/debug/profile/{trace_id}")
+def profile(trace_id: str, user=Depends(handouts.user)):
+    trace = metrics.get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(404, "Trace not found")
+    return trace
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus(authorization: str = Header(None)):
+    if settings.METRICS_TOKEN and authorization != f"Bearer {settings.METRICS_TOKEN}":
+        raise HTTPException(401, "Invalid token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
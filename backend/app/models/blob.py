@@ -0,0 +1,18 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import Optional
+
+
+class Blob(SQLModel, table=True):
+    # content-addressed file, shared by every version with the same bytes
+    checksum: str = Field(primary_key=True)
+    size: int
+    mime: Optional[str] = None
+    path: str
+    refcount: int = Field(default=0)
+    # how the bytes sit on disk: "raw" at path, or "zlib" / "bsdiff" next
+    # to it (see blob_service.stored_path); bsdiff patches base_checksum
+    encoding: str = Field(default="raw")
+    base_checksum: Optional[str] = Field(default=None, index=True)
+    stored_size: Optional[int] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,15 +1,25 @@
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Relationship, UniqueConstraint, Index
 from datetime import datetime
 from uuid import uuid4
 from typing import List, Optional
 
 
 class Handout(SQLModel, table=True):
-    id: str = Field(default_factory=lambda: str(uuid4()), primary_key=True)
+    # one handout per (subject, case-insensitive title); uploads with the
+    # same title become new versions of it
+    __table_args__ = (
+        UniqueConstraint("subject", "title_key"),
+        # keyset pagination for the other sort orders of /subject/{name}
+        Index("ix_handout_subject_created", "subject", "created_at", "id"),
+        Index("ix_handout_subject_versions", "subject", "latest_version", "id"),
+    )
+
+    id: str = Field(default_factory=lambda: uuid4().hex, primary_key=True)
 
     subject: str = Field(index=True)
     title: str
-    owner_id: str
+    title_key: str
+    owner_id: str = Field(default="local")
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
     latest_version: int = Field(default=1)
@@ -1,4 +1,7 @@
 from .handout import Handout
-from .handout_version import HandoutVersion
+from .version import HandoutVersion
+from .subject import Subject
+from .blob import Blob
+from .job import IngestJob
 
-__all__ = ["Handout", "HandoutVersion"]
+__all__ = ["Handout", "HandoutVersion", "Subject", "Blob", "IngestJob"]
@@ -0,0 +1,20 @@
+from sqlmodel import SQLModel, Field, UniqueConstraint
+from datetime import datetime
+from typing import Optional
+
+
+class IngestJob(SQLModel, table=True):
+    # one job per (version, kind); re-enqueueing is a no-op
+    __table_args__ = (UniqueConstraint("version_id", "kind"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    version_id: str = Field(index=True)
+    checksum: Optional[str] = Field(default=None, index=True)
+    kind: str
+    # pending -> running -> done | failed (pending again while retries last)
+    status: str = Field(default="pending", index=True)
+    attempts: int = Field(default=0)
+    error: Optional[str] = None
+    run_after: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,11 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+
+class Subject(SQLModel, table=True):
+    # denormalised counter so /subjects never has to scan handouts
+    name: str = Field(primary_key=True)
+    handout_count: int = Field(default=0)
+    # bumped on every new handout or version; drives listing ETags
+    generation: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
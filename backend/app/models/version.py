@@ -1,15 +1,26 @@
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Relationship, UniqueConstraint
 from datetime import datetime
-from uuid import uuid4
+from typing import Optional
 
 
 class HandoutVersion(SQLModel, table=True):
-    id: str = Field(default_factory=lambda: str(uuid4()), primary_key=True)
+    # (handout_id, version) doubles as the index behind /{id}/versions
+    __table_args__ = (UniqueConstraint("handout_id", "version"),)
+
+    # "<handout_id>_v<version>", same ids the JSON store used
+    id: str = Field(primary_key=True)
 
     handout_id: str = Field(foreign_key="handout.id")
-    version_number: int
+    version: int
     filename: str
-    storage_path: str
+    file_path: str
+    file_type: Optional[str] = None
+    file_size: int = Field(default=0)
+    checksum: Optional[str] = Field(default=None, index=True)
+    summary: Optional[str] = None
+    uploaded_by: Optional[str] = None
+    downloads: int = Field(default=0)
+    previews: int = Field(default=0)
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -1,6 +1,7 @@
 # app/routers/auth.py
 from fastapi import APIRouter, Header, HTTPException
 import jwt
+from app import firebase
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -27,7 +28,14 @@ def me(authorization: str | None = Header(None)):
 
     token = authorization.replace("Bearer ", "").strip()
 
-    claims = safe_decode(token)
+    if firebase.project_id():
+        # verified, and cached until the token expires
+        try:
+            claims = dict(firebase.verify_token(token))
+        except Exception:
+            return {"authenticated": False, "role": "guest"}
+    else:
+        claims = safe_decode(token)
     if not claims:
         return {"authenticated": False, "role": "guest"}
 
@@ -1,31 +1,35 @@
 import os
-import json
-import uuid
+from typing import List, Literal
 from fastapi import (
     APIRouter, Depends, Header, UploadFile, File,
-    HTTPException, Form
+    HTTPException, Form, Query, Request
 )
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from sqlmodel import Session
+from app.config import get_settings
+from app.deps import get_session, read_session, grouped_write
+from app.services import (
+    handout_service, version_service, blob_service, stats_service, search_service,
+    job_queue, ingest_worker, bulk_service, thumbnail_service, metadata_cache,
+)
+from app.utils import file_utils, file_response, listing, signed_url, zip_stream
+from app import firebase
 
+settings = get_settings()
 router = APIRouter(prefix="/handouts", tags=["handouts"])
 
 # ============================================================
-# JSON STORAGE (NO DATABASE)
+# METADATA STORAGE (SQLite via app.deps / app.services)
 # ============================================================
-DATA_FILE = "handout_data.json"
-
-def load_data():
-    if not os.path.exists(DATA_FILE):
-        return {"subjects": {}, "handouts": {}, "versions": {}}
-    with open(DATA_FILE, "r") as f:
-        return json.load(f)
-
-def save_data(data):
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+# Reads use a per-request session; upload metadata goes through
+# deps.grouped_write(), which commits concurrent uploads together under
+# deps.write_lock so they cannot clobber each other, even across worker
+# processes. The old handout_data.json is imported once on startup.
 
 
 # ============================================================
-# STATIC TOKEN AUTH
+# AUTH: STATIC TOKEN OR FIREBASE ID TOKEN
 # ============================================================
 STATIC_SECRET = "HANDOUTVAULTSECRET123"
 
@@ -34,157 +38,358 @@ def user(authorization: str = Header(None)):
         raise HTTPException(401, "Missing token")
 
     token = authorization.replace("Bearer ", "").strip()
-    if token != STATIC_SECRET:
-        raise HTTPException(401, "Invalid token")
-
-    return {"user": "local"}
+    if token == STATIC_SECRET:
+        return {"user": "local"}
 
+    # Firebase ID token; a repeat is just a cache lookup
+    try:
+        claims = firebase.verify_token(token)
+    except Exception:
+        raise HTTPException(401, "Invalid token")
 
-# ============================================================
-# UTIL: FILE SAVER
-# ============================================================
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-def save_file(file: UploadFile):
-    ext = file.filename.split(".")[-1]
-    unique_name = f"{uuid.uuid4()}.{ext}"
-    path = os.path.join(UPLOAD_DIR, unique_name)
+    return {"user": claims["uid"], "claims": claims}
 
-    with open(path, "wb") as f:
-        f.write(file.file.read())
 
-    return path
+def user_or_signed_url(
+    version_id: str, authorization: str = Header(None),
+    expires: int = Query(None), sig: str = Query(None),
+    session: Session = Depends(get_session),
+):
+    # <iframe>/<img> cannot set headers, so media URLs may carry a
+    # signature from /handouts/{id}/media-signature instead
+    if authorization or not sig:
+        return user(authorization)
+    v = metadata_cache.version(session, version_id)
+    if not v or not signed_url.verify(v.handout_id, expires, sig):
+        raise HTTPException(401, "Invalid signature")
+    return {"user": "signed-url"}
 
 
 # ============================================================
 # LIST ALL SUBJECTS
 # ============================================================
 @router.get("/subjects")
-def get_subjects(user=Depends(user)):
-    data = load_data()
-    subjects = []
+def get_subjects(
+    request: Request,
+    sort: Literal["name", "count"] = "name",
+    limit: int = Query(listing.DEFAULT_LIMIT, ge=1, le=listing.MAX_LIMIT),
+    cursor: str = None,
+    fields: str = None,
+    user=Depends(user), session: Session = Depends(get_session),
+):
+    # repeats are served from memory until any subject changes
+    def validators():
+        generation, count, changed = handout_service.subjects_state(session)
+        return listing.weak_etag("subjects", generation, count, sort, limit, cursor, fields), changed
 
-    for subject, handout_ids in data["subjects"].items():
-        subjects.append({"id": subject, "count": len(handout_ids)})
+    def build(etag, changed):
+        items, next_key = handout_service.list_subjects(
+            session, sort, limit, listing.decode_cursor(cursor, sort),
+        )
+        return listing.page_response(items, next_key, sort, fields, etag, changed)
 
-    return subjects
+    key = ("subjects", sort, limit, cursor, fields)
+    return metadata_cache.listing_response(request, key, None, validators, build)
 
 
 # ============================================================
 # LIST HANDOUTS INSIDE A SUBJECT
 # ============================================================
 @router.get("/subject/{subject_name}")
-def get_handouts(subject_name: str, user=Depends(user)):
-    data = load_data()
+def get_handouts(
+    subject_name: str,
+    request: Request,
+    sort: Literal["oldest", "newest", "title", "versions"] = "oldest",
+    limit: int = Query(listing.DEFAULT_LIMIT, ge=1, le=listing.MAX_LIMIT),
+    cursor: str = None,
+    fields: str = None,
+    user=Depends(user), session: Session = Depends(get_session),
+):
+    # the subject's change counter moves on every upload into it, so it
+    # is all a client needs to revalidate this listing (and all the
+    # memoised page needs to stay current)
+    def validators():
+        s = metadata_cache.subject(session, subject_name)
+        generation, changed = (s.generation, s.updated_at) if s else (0, None)
+        return listing.weak_etag("subject", subject_name, generation, sort, limit, cursor, fields), changed
 
-    if subject_name not in data["subjects"]:
-        return []
+    def build(etag, changed):
+        items, next_key = handout_service.list_handouts(
+            session, subject_name, sort, limit, listing.decode_cursor(cursor, sort),
+        )
+        return listing.page_response(items, next_key, sort, fields, etag, changed)
 
-    result = []
-    for hid in data["subjects"][subject_name]:
-        result.append(data["handouts"][hid])
+    key = ("subject", subject_name, sort, limit, cursor, fields)
+    return metadata_cache.listing_response(request, key, subject_name, validators, build)
 
-    return result
+
+# ============================================================
+# SEMANTIC SEARCH
+# ============================================================
+@router.get("/search")
+def search_handouts(
+    q: str = Query(..., min_length=2),
+    subject: str = None,
+    handout_id: str = None,
+    limit: int = Query(10, ge=1, le=50),
+    user=Depends(user),
+):
+    return search_service.search(q, subject=subject, handout_id=handout_id, limit=limit)
 
 
 # ============================================================
 # UPLOAD HANDOUT OR NEW VERSION
 # ============================================================
+def record_upload(subject, title, filename, tmp_path, checksum, size, mime, uploaded_by):
+    def write(s):
+        handout, v, created = version_service.add_blob_upload(
+            s, subject, title, filename, tmp_path, checksum, size, mime, uploaded_by,
+        )
+        return handout.id, created, v.id
+
+    result = grouped_write(write)
+    ingest_worker.notify()
+    return result
+
+
+def blob_exists(checksum):
+    with read_session() as s:
+        return blob_service.get_blob(s, checksum) is not None
+
+
 @router.post("/upload")
 async def upload_handout(
     subject: str = Form(...),
     title: str = Form(...),
-    file: UploadFile = File(...),
+    file: UploadFile = File(None),
+    checksum: str = Form(None),
     user=Depends(user),
 ):
-    data = load_data()
+    tmp_path = None
+    size = mime = None
 
-    # ensure subject exists
-    if subject not in data["subjects"]:
-        data["subjects"][subject] = []
+    # client-declared sha256 of bytes we already hold: link, don't store
+    known = bool(checksum) and await run_in_threadpool(blob_exists, checksum.lower())
+    if known:
+        checksum = checksum.lower()
+        if file is not None:
+            digest, size, mime = await file_utils.hash_upload(file)
+            known = digest == checksum
 
-    # save file
-    file_path = save_file(file)
+    if not known:
+        if file is None:
+            raise HTTPException(400, "File required")
+        # stream to disk in chunks; size/checksum/type come out of the same pass
+        tmp_path, checksum, size, mime = await file_utils.save_file(file)
 
-    # check if handout already exists
-    existing_id = None
-    for hid, hdata in data["handouts"].items():
-        if hdata["subject"] == subject and hdata["title"].lower() == title.lower():
-            existing_id = hid
-            break
+    handout_id, created, version_id = await run_in_threadpool(
+        record_upload, subject, title, file.filename if file else title,
+        tmp_path, checksum, size, mime, user["user"],
+    )
 
-    if existing_id:
-        # Add version
-        handout = data["handouts"][existing_id]
-        new_version = handout["latest_version"] + 1
+    if not created:
+        return {"status": "ok", "message": "New version added", "handout_id": handout_id}
+
+    return {"status": "ok", "message": "Handout uploaded", "handout_id": handout_id}
+
+
+# ============================================================
+# BULK IMPORT: A ZIP ARCHIVE OR MANY FILES IN ONE REQUEST
+# ============================================================
+def import_batch(items, uploaded_by):
+    results = bulk_service.record_batch(items, uploaded_by)
+    ingest_worker.notify()
+    return results
+
+
+@router.post("/bulk")
+async def bulk_upload(
+    subject: str = Form(None),
+    archive: UploadFile = File(None),
+    files: List[UploadFile] = File(None),
+    manifest: str = Form(None),
+    user=Depends(user),
+):
+    # subject/title come from the manifest, then "Subject/Title.pdf"
+    # paths inside the archive, then the subject field and file name
+    manifest = bulk_service.parse_manifest(manifest) if manifest else None
+    if archive is not None:
+        items = await run_in_threadpool(bulk_service.stage_zip, archive.file, subject, manifest)
+    elif files:
+        if len(files) > settings.BULK_MAX_FILES:
+            raise HTTPException(413, f"At most {settings.BULK_MAX_FILES} files per import")
+        items = await bulk_service.stage_uploads(files, subject, manifest)
+    else:
+        raise HTTPException(400, "Archive or files required")
+
+    # all metadata lands in a single transaction
+    results = await run_in_threadpool(import_batch, items, user["user"])
+    failed = sum(r["status"] != "ok" for r in results)
+    return {"status": "ok", "imported": len(results) - failed, "failed": failed, "results": results}
 
-        version_id = f"{existing_id}_v{new_version}"
-        data["versions"][version_id] = {
-            "version_id": version_id,
-            "handout_id": existing_id,
-            "version": new_version,
-            "file_path": file_path
-        }
 
-        handout["latest_version"] = new_version
-        save_data(data)
+# ============================================================
+# EXPORT A SUBJECT AS A ZIP ARCHIVE
+# ============================================================
+@router.get("/subject/{subject_name}/export")
+def export_subject(
+    subject_name: str,
+    versions: Literal["latest", "all"] = "latest",
+    user=Depends(user), session: Session = Depends(get_session),
+):
+    if not metadata_cache.subject(session, subject_name):
+        raise HTTPException(404, "Subject does not exist")
 
-        return {"status": "ok", "message": "New version added", "handout_id": existing_id}
+    # built while it is sent: no temp file, memory bounded by one chunk
+    entries = bulk_service.export_entries(subject_name, all_versions=versions == "all")
+    name = f"{bulk_service.safe_name(subject_name)}.zip"
+    return StreamingResponse(
+        zip_stream.stream_zip(entries), media_type="application/zip",
+        headers={"Content-Disposition": file_response.content_disposition("attachment", name)},
+    )
 
-    # create new handout
-    new_id = uuid.uuid4().hex
 
-    data["handouts"][new_id] = {
-        "id": new_id,
-        "title": title,
-        "subject": subject,
-        "latest_version": 1
-    }
+# ============================================================
+# LIST VERSIONS OF A HANDOUT
+# ============================================================
+@router.get("/{handout_id}/versions")
+def get_versions(
+    handout_id: str,
+    sort: Literal["newest", "oldest"] = "newest",
+    limit: int = Query(listing.DEFAULT_LIMIT, ge=1, le=listing.MAX_LIMIT),
+    cursor: str = None,
+    fields: str = None,
+    user=Depends(user), session: Session = Depends(get_session),
+):
+    # no validators here: download/preview counters change without
+    # touching the subject's change counter
+    items, next_key = version_service.list_versions(
+        session, handout_id, sort, limit, listing.decode_cursor(cursor, sort),
+    )
+    return listing.page_response(items, next_key, sort, fields)
 
-    data["subjects"][subject].append(new_id)
 
-    # version 1
-    version_id = f"{new_id}_v1"
-    data["versions"][version_id] = {
-        "version_id": version_id,
-        "handout_id": new_id,
-        "version": 1,
-        "file_path": file_path
-    }
+# ============================================================
+# GET SPECIFIC VERSION FILE INFO
+# ============================================================
+@router.get("/{handout_id}/version/{version_number}")
+def get_version_file(
+    handout_id: str, version_number: int,
+    user=Depends(user), session: Session = Depends(get_session),
+):
+    v = metadata_cache.version(session, version_service.version_id(handout_id, version_number))
 
-    save_data(data)
+    if not v:
+        raise HTTPException(404, "Version does not exist")
 
-    return {"status": "ok", "message": "Handout uploaded", "handout_id": new_id}
+    return {"file_path": v.file_path}
 
 
 # ============================================================
-# LIST VERSIONS OF A HANDOUT
+# DOWNLOAD / PREVIEW A VERSION
 # ============================================================
-@router.get("/{handout_id}/versions")
-def get_versions(handout_id: str, user=Depends(user)):
-    data = load_data()
+def serve_version(request: Request, session: Session, v, kind: str, inline: bool):
+    path = version_service.local_path(session, v) if v else None
+    if not path or not os.path.exists(path):
+        raise HTTPException(404, "Version does not exist")
 
-    result = []
-    for vid, vdata in data["versions"].items():
-        if vdata["handout_id"] == handout_id:
-            result.append(vdata)
+    response = file_response.send_file(
+        request, path, media_type=v.file_type or "application/octet-stream",
+        checksum=v.checksum, filename=v.filename, inline=inline,
+    )
+    # count real views only: not 304s, not a viewer's follow-up range reads
+    if response.status_code in (200, 206) and file_response.is_first_fetch(request):
+        stats_service.record(v.id, kind)
+    return response
 
-    # newest first
-    result.sort(key=lambda x: x["version"], reverse=True)
 
-    return result
+@router.get("/{handout_id}/versions/{version_id}/download")
+def download_version(
+    handout_id: str, version_id: str, request: Request,
+    user=Depends(user), session: Session = Depends(get_session),
+):
+    v = metadata_cache.version(session, version_id)
+    if v and v.handout_id != handout_id:
+        v = None
+    return serve_version(request, session, v, "downloads", inline=False)
+
+
+@router.get("/preview/{version_id}")
+def preview_version(
+    version_id: str, request: Request,
+    user=Depends(user_or_signed_url), session: Session = Depends(get_session),
+):
+    v = metadata_cache.version(session, version_id)
+    return serve_version(request, session, v, "previews", inline=True)
+
+
+@router.get("/{handout_id}/media-signature")
+def media_signature(handout_id: str, user=Depends(user), session: Session = Depends(get_session)):
+    """?expires=&sig= for the preview and image URLs of every version."""
+    if not metadata_cache.handout(session, handout_id):
+        raise HTTPException(404, "Handout does not exist")
+    return signed_url.sign(handout_id)
 
 
 # ============================================================
-# GET SPECIFIC VERSION FILE INFO
+# THUMBNAILS / FIRST-PAGE PREVIEW IMAGE
 # ============================================================
-@router.get("/{handout_id}/version/{version_number}")
-def get_version_file(handout_id: str, version_number: int, user=Depends(user)):
-    data = load_data()
-    version_id = f"{handout_id}_v{version_number}"
+def serve_image(request: Request, session: Session, v, name: str):
+    if not v:
+        raise HTTPException(404, "Version does not exist")
+
+    # rendered images never change for the same bytes
+    etag = f'"{v.checksum or v.id}-{name}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if file_response.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    data = thumbnail_service.get_image(session, v, name)
+    if data is None:
+        raise HTTPException(404, "No image for this version")
+    return Response(data, media_type="image/jpeg", headers=headers)
+
+
+@router.get("/preview/{version_id}/image")
+def preview_image(
+    version_id: str, request: Request,
+    user=Depends(user_or_signed_url), session: Session = Depends(get_session),
+):
+    v = metadata_cache.version(session, version_id)
+    return serve_image(request, session, v, thumbnail_service.PREVIEW)
+
 
-    if version_id not in data["versions"]:
+@router.get("/thumbnail/{version_id}")
+def page_thumbnail(
+    version_id: str, request: Request,
+    page: int = Query(1, ge=1, le=settings.THUMBNAIL_PAGES),
+    user=Depends(user_or_signed_url), session: Session = Depends(get_session),
+):
+    v = metadata_cache.version(session, version_id)
+    return serve_image(request, session, v, thumbnail_service.page_name(page))
+
+
+@router.get("/{handout_id}/versions/{version_id}/thumbnails")
+def version_thumbnails(
+    handout_id: str, version_id: str,
+    user=Depends(user), session: Session = Depends(get_session),
+):
+    v = metadata_cache.version(session, version_id)
+    if not v or v.handout_id != handout_id:
         raise HTTPException(404, "Version does not exist")
+    # None until the thumbnail job (or a first image read) has run
+    return {"version_id": v.id, "pages": thumbnail_service.page_count(v)}
+
 
-    return {"file_path": data["versions"][version_id]["file_path"]}
+# ============================================================
+# POST-PROCESSING STATUS OF A VERSION
+# ============================================================
+@router.get("/{handout_id}/versions/{version_id}/status")
+def version_status(
+    handout_id: str, version_id: str,
+    user=Depends(user), session: Session = Depends(get_session),
+):
+    v = metadata_cache.version(session, version_id)
+    if not v or v.handout_id != handout_id:
+        raise HTTPException(404, "Version does not exist")
+    return {"version_id": v.id, "jobs": job_queue.version_status(session, v.id)}
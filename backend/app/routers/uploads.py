@@ -0,0 +1,219 @@
+# app/routers/uploads.py
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import aiofiles
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from app.config import get_settings
+from app.routers.handouts import user, record_upload
+from app.utils import file_utils
+
+settings = get_settings()
+
+router = APIRouter(prefix="/handouts/uploads", tags=["uploads"])
+
+# ============================================================
+# RESUMABLE UPLOAD SESSIONS
+# ============================================================
+# Each session is a directory under STORAGE_PATH/sessions:
+#   meta.json   what the client declared at init
+#   data.bin    preallocated target; part n is written at n * part_size
+#   parts/<n>   empty marker, created once part n is fully on disk
+# Parts land directly in their final position, so they can arrive in
+# any order or in parallel and commit never has to reassemble them.
+
+class UploadInit(BaseModel):
+    subject: str
+    title: str
+    filename: str
+    size: int
+    content_type: str | None = None
+
+
+def session_dir(upload_id: str):
+    # ids are server generated hex; refuse anything else
+    if not upload_id.isalnum():
+        raise HTTPException(404, "Upload session not found")
+    return os.path.join(settings.STORAGE_PATH, "sessions", upload_id)
+
+
+def load_meta(upload_id: str, user: dict):
+    path = os.path.join(session_dir(upload_id), "meta.json")
+    if not os.path.exists(path):
+        raise HTTPException(404, "Upload session not found")
+    with open(path, "r") as f:
+        meta = json.load(f)
+    # someone else's session looks the same as a missing one
+    if meta.get("uploaded_by") != user["user"]:
+        raise HTTPException(404, "Upload session not found")
+    return meta
+
+
+def received_parts(upload_id: str):
+    parts = os.path.join(session_dir(upload_id), "parts")
+    return sorted(int(n) for n in os.listdir(parts))
+
+
+def session_status(upload_id: str, meta: dict):
+    received = received_parts(upload_id)
+    have = set(received)
+    return {
+        "upload_id": upload_id,
+        "size": meta["size"],
+        "part_size": meta["part_size"],
+        "total_parts": meta["total_parts"],
+        "received": received,
+        "missing": [n for n in range(meta["total_parts"]) if n not in have],
+    }
+
+
+@router.post("")
+def init_upload(body: UploadInit, user=Depends(user)):
+    if body.size <= 0:
+        raise HTTPException(400, "Empty file")
+    if body.size > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(413, "File too large")
+
+    upload_id = uuid.uuid4().hex
+    folder = session_dir(upload_id)
+    os.makedirs(os.path.join(folder, "parts"))
+
+    part_size = settings.UPLOAD_PART_SIZE
+    meta = {
+        **body.model_dump(),
+        "part_size": part_size,
+        "total_parts": -(-body.size // part_size),
+        "created": time.time(),
+        "uploaded_by": user["user"],
+    }
+
+    # sparse preallocation; parts fill it in place
+    with open(os.path.join(folder, "data.bin"), "wb") as f:
+        f.truncate(body.size)
+    with open(os.path.join(folder, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    return session_status(upload_id, meta)
+
+
+@router.get("/{upload_id}")
+def get_upload(upload_id: str, user=Depends(user)):
+    return session_status(upload_id, load_meta(upload_id, user))
+
+
+@router.put("/{upload_id}/parts/{part_number}")
+async def put_part(upload_id: str, part_number: int, request: Request, user=Depends(user)):
+    meta = load_meta(upload_id, user)
+    if not 0 <= part_number < meta["total_parts"]:
+        raise HTTPException(400, "Part number out of range")
+
+    offset = part_number * meta["part_size"]
+    expected = min(meta["part_size"], meta["size"] - offset)
+    folder = session_dir(upload_id)
+
+    # optional end-to-end check of this part
+    want_sha = request.headers.get("x-part-sha256")
+    sha = hashlib.sha256() if want_sha else None
+
+    # a re-sent part is incomplete until it has been fully rewritten
+    marker = os.path.join(folder, "parts", str(part_number))
+    if os.path.exists(marker):
+        os.remove(marker)
+
+    written = 0
+    try:
+        async with aiofiles.open(os.path.join(folder, "data.bin"), "r+b") as f:
+            await f.seek(offset)
+            async for chunk in request.stream():
+                written += len(chunk)
+                if written > expected:
+                    raise HTTPException(400, "Part larger than expected")
+                if sha:
+                    sha.update(chunk)
+                await f.write(chunk)
+    except FileNotFoundError:
+        raise HTTPException(409, "Upload already committed")
+
+    if written != expected:
+        raise HTTPException(400, f"Part must be {expected} bytes, got {written}")
+    if sha and sha.hexdigest() != want_sha.lower():
+        raise HTTPException(400, "Part checksum mismatch")
+
+    try:
+        open(marker, "w").close()
+    except FileNotFoundError:
+        # a concurrent commit removed the session meanwhile
+        raise HTTPException(409, "Upload already committed")
+
+    return {"part": part_number, "size": written}
+
+
+def finish_upload(upload_id: str, meta: dict):
+    folder = session_dir(upload_id)
+    data = os.path.join(folder, "data.bin")
+    claimed = os.path.join(folder, "data.committing")
+
+    # the rename doubles as a lock against a concurrent second commit
+    try:
+        os.rename(data, claimed)
+    except FileNotFoundError:
+        raise HTTPException(409, "Upload already committed")
+
+    checksum, size, mime = file_utils.hash_path(claimed, meta.get("content_type"))
+    if mime not in file_utils.ALLOWED_TYPES:
+        shutil.rmtree(folder, ignore_errors=True)
+        raise HTTPException(415, "Unsupported file type")
+
+    # the blob store moves (or drops) the file it is given before the
+    # transaction commits, so give it a second name and keep this one
+    adopt = os.path.join(folder, "data.adopt")
+    try:
+        os.link(claimed, adopt)
+    except OSError:
+        shutil.copyfile(claimed, adopt)
+
+    try:
+        handout_id, created, version_id = record_upload(
+            meta["subject"], meta["title"], meta["filename"],
+            adopt, checksum, size, mime, meta["uploaded_by"],
+        )
+    except BaseException:
+        # hand the data back so the commit can be retried
+        if os.path.exists(adopt):
+            os.remove(adopt)
+        os.rename(claimed, data)
+        raise
+    shutil.rmtree(folder, ignore_errors=True)
+
+    return handout_id, created, version_id, checksum
+
+
+@router.post("/{upload_id}/commit")
+async def commit_upload(upload_id: str, user=Depends(user)):
+    meta = load_meta(upload_id, user)
+    status = session_status(upload_id, meta)
+    if status["missing"]:
+        raise HTTPException(409, {"message": "Missing parts", "missing": status["missing"]})
+
+    handout_id, created, version_id, checksum = await run_in_threadpool(
+        finish_upload, upload_id, meta,
+    )
+
+    return {
+        "status": "ok",
+        "message": "Handout uploaded" if created else "New version added",
+        "handout_id": handout_id,
+        "checksum": checksum,
+    }
+
+
+@router.delete("/{upload_id}")
+def abort_upload(upload_id: str, user=Depends(user)):
+    load_meta(upload_id, user)
+    shutil.rmtree(session_dir(upload_id), ignore_errors=True)
+    return {"status": "ok"}
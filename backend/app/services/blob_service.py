@@ -0,0 +1,429 @@
+# backend/app/services/blob_service.py
+"""Content-addressed storage: identical bytes are kept once, under their SHA-256.
+
+With STORAGE_MODE=compact, blobs only older versions point at may be
+stored as a bsdiff patch against the next newer version (both no larger
+than DELTA_MAX_SIZE), or zlib compressed; materialize() rebuilds and
+verifies them on read.
+
+    python -m app.services.blob_service gc
+    python -m app.services.blob_service rebalance
+"""
+import os
+import time
+import uuid
+import zlib
+import shutil
+import asyncio
+import hashlib
+import logging
+from datetime import timezone
+from sqlmodel import Session, select, func
+from app.config import get_settings
+from app.deps import read_session, write_session
+from app.models.blob import Blob
+from app.models.handout import Handout
+from app.models.version import HandoutVersion
+from app.utils import metrics
+
+settings = get_settings()
+log = logging.getLogger(__name__)
+
+def blob_dir():
+    return os.path.join(settings.STORAGE_PATH, "blobs")
+
+def staging_dir():
+    return os.path.join(settings.STORAGE_PATH, "tmp")
+
+def blob_path(checksum: str):
+    # two levels of fan-out keep directories small
+    return os.path.join(blob_dir(), checksum[:2], checksum[2:4], checksum)
+
+def stored_path(b: Blob):
+    return b.path if b.encoding == "raw" else f"{b.path}.{b.encoding}"
+
+def materialized_dir():
+    return os.path.join(settings.STORAGE_PATH, "materialized")
+
+def get_blob(session: Session, checksum: str):
+    return session.get(Blob, checksum)
+
+@metrics.timed("storage.store_blob")
+def store(session: Session, tmp_path: str, checksum: str, size: int, mime: str):
+    """Adopt a freshly written upload as a blob and take a reference on it.
+
+    If the bytes are already stored the temp file is simply dropped.
+    Must run inside deps.write_session().
+    """
+    b = session.get(Blob, checksum)
+    if b and b.encoding != "raw":
+        # the bytes are current again: keep them plain. The old encoded
+        # file is left for gc, so a rollback here loses nothing
+        os.replace(tmp_path, b.path)
+        b.encoding, b.base_checksum, b.stored_size = "raw", None, None
+    elif b:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    else:
+        path = blob_path(checksum)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        b = Blob(checksum=checksum, size=size, mime=mime, path=path)
+
+    b.refcount += 1
+    session.add(b)
+    return b
+
+def add_ref(session: Session, checksum: str):
+    """Reference an already stored blob without touching the disk."""
+    b = session.get(Blob, checksum)
+    if not b:
+        raise Exception("Blob not found")
+    b.refcount += 1
+    session.add(b)
+    return b
+
+def release(session: Session, checksum: str):
+    b = session.get(Blob, checksum)
+    if b and b.refcount > 0:
+        b.refcount -= 1
+        session.add(b)
+    return b
+
+# ============================================================
+# ENCODED BLOBS
+# ============================================================
+def _bsdiff4():
+    # optional: without it older versions can only be zlib compressed
+    try:
+        import bsdiff4
+    except ImportError:
+        return None
+    return bsdiff4
+
+def _decode(session: Session, src: str, encoding: str, base_checksum: str, out_path: str):
+    """Write the original bytes of an encoded file to out_path; returns their sha256."""
+    sha = hashlib.sha256()
+    with open(src, "rb") as f, open(out_path, "wb") as out:
+        if encoding == "zlib":
+            d = zlib.decompressobj()
+            while chunk := f.read(settings.UPLOAD_CHUNK_SIZE):
+                data = d.decompress(chunk)
+                sha.update(data)
+                out.write(data)
+            data = d.flush()
+        elif encoding == "bsdiff":
+            # whole files in memory: rebalance only makes patches between
+            # blobs up to DELTA_MAX_SIZE
+            bsdiff4 = _bsdiff4()
+            if bsdiff4 is None:
+                raise Exception("bsdiff4 is needed to read delta-stored blobs")
+            base = session.get(Blob, base_checksum)
+            if not base:
+                raise Exception(f"Delta base {base_checksum} not found")
+            with open(materialize(session, base), "rb") as bf:
+                data = bsdiff4.patch(bf.read(), f.read())
+        else:
+            raise Exception(f"Unknown blob encoding {encoding!r}")
+        sha.update(data)
+        out.write(data)
+    return sha.hexdigest()
+
+@metrics.timed("storage.materialize")
+def materialize(session: Session, b: Blob):
+    """Path to a plain copy of b's bytes, rebuilt first if b is encoded.
+
+    Every rebuild is checked against the checksum before it is used;
+    the copy is then kept under materialized/ until gc finds it unused
+    for MATERIALIZED_TTL. A kept copy is only checked for its size on
+    later reads, which catches truncation without rehashing the file.
+    """
+    if b.encoding == "raw":
+        return b.path
+
+    path = os.path.join(materialized_dir(), b.checksum[:2], b.checksum)
+    try:
+        if os.path.getsize(path) == b.size:
+            os.utime(path)
+            return path
+        log.warning("materialized copy of %s has the wrong size, rebuilding", b.checksum)
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        if _decode(session, stored_path(b), b.encoding, b.base_checksum, tmp) != b.checksum:
+            raise Exception(f"Blob {b.checksum} failed checksum verification")
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+# ============================================================
+# REBALANCE
+# ============================================================
+def _plan(session: Session):
+    """Per blob: its reads, whether a latest version uses it, and the
+    blob of the next newer version of the same handout (the delta base)."""
+    reads = dict(session.exec(
+        select(HandoutVersion.checksum, func.sum(HandoutVersion.downloads + HandoutVersion.previews))
+        .where(HandoutVersion.checksum.is_not(None))
+        .group_by(HandoutVersion.checksum)
+    ).all())
+    latest = set(session.exec(
+        select(HandoutVersion.checksum)
+        .join(Handout, Handout.id == HandoutVersion.handout_id)
+        .where(HandoutVersion.version == Handout.latest_version)
+    ).all())
+
+    # newest first, so a blob's base is always visited before the blob
+    order, bases, newer = [], {}, {}
+    for hid, checksum in session.exec(
+        select(HandoutVersion.handout_id, HandoutVersion.checksum)
+        .where(HandoutVersion.checksum.is_not(None))
+        .order_by(HandoutVersion.handout_id, HandoutVersion.version.desc())
+    ).all():
+        if checksum not in bases:
+            order.append(checksum)
+            bases[checksum] = newer.get(hid)
+        newer[hid] = checksum
+
+    state = {b.checksum: (b.encoding, b.base_checksum) for b in session.exec(select(Blob)).all()}
+    return order, bases, reads, latest, state
+
+def _depth(state, checksum):
+    """Patches applied to rebuild checksum; None if the chain loops."""
+    seen = set()
+    while checksum in state and state[checksum][0] == "bsdiff":
+        if checksum in seen:
+            return None
+        seen.add(checksum)
+        checksum = state[checksum][1]
+    return len(seen)
+
+def _candidates(src: str, base_src: str, staging: str):
+    """Encode src every way available; returns [(encoding, path, size)]."""
+    out = []
+    z = os.path.join(staging, f"{uuid.uuid4().hex}.zlib")
+    c = zlib.compressobj(6)
+    with open(src, "rb") as f, open(z, "wb") as o:
+        while chunk := f.read(settings.UPLOAD_CHUNK_SIZE):
+            o.write(c.compress(chunk))
+        o.write(c.flush())
+    out.append(("zlib", z, os.path.getsize(z)))
+
+    bsdiff4 = _bsdiff4()
+    if bsdiff4 is not None and base_src:
+        d = os.path.join(staging, f"{uuid.uuid4().hex}.bsdiff")
+        bsdiff4.file_diff(base_src, src, d)
+        out.append(("bsdiff", d, os.path.getsize(d)))
+    return out
+
+def _verify(encoding: str, base: str, path: str, checksum: str):
+    check = f"{path}.check"
+    try:
+        with read_session() as s:
+            return _decode(s, path, encoding, base, check) == checksum
+    finally:
+        if os.path.exists(check):
+            os.remove(check)
+
+def _swap(checksum: str, expect: str, encoding: str, base: str, tmp_path: str, size: int):
+    """Move a blob to its new representation unless it changed meanwhile."""
+    with write_session() as s:
+        b = s.get(Blob, checksum)
+        if not b or b.encoding != expect:
+            return False
+        if encoding != "raw" and s.exec(
+            select(HandoutVersion.id)
+            .join(Handout, Handout.id == HandoutVersion.handout_id)
+            .where(HandoutVersion.checksum == checksum, HandoutVersion.version == Handout.latest_version)
+        ).first():
+            return False  # uploaded again as a latest version since planning
+        old = stored_path(b)
+        b.encoding, b.base_checksum, b.stored_size = encoding, base, size
+        new = stored_path(b)
+        os.replace(tmp_path, new)
+        s.add(b)
+    if old != new:
+        os.remove(old)
+    return True
+
+def _rebalance_one(checksum, encoding, base, bar, keep_raw, state, staging):
+    """Returns ("encoded", bytes saved), ("restored", 0) or None."""
+    if keep_raw:
+        if encoding == "raw":
+            return None
+        with read_session() as s:
+            plain = materialize(s, s.get(Blob, checksum))
+        # the verified rebuild simply becomes the plain copy
+        return ("restored", 0) if _swap(checksum, encoding, "raw", None, plain, None) else None
+
+    if encoding != "raw" and (_depth(state, checksum) or 0) <= settings.DELTA_MAX_CHAIN:
+        return None  # already encoded, chain still short enough
+
+    with read_session() as s:
+        b = s.get(Blob, checksum)
+
+        base_blob = s.get(Blob, base) if base else None
+        if base_blob is not None and max(b.size, base_blob.size) > settings.DELTA_MAX_SIZE:
+            base_blob = None
+        if base_blob is not None:
+            depth = _depth({**state, checksum: ("bsdiff", base)}, checksum)
+            if depth is None or depth > settings.DELTA_MAX_CHAIN:
+                base_blob = None
+        size = b.size
+        src = materialize(s, b)
+        base_src = materialize(s, base_blob) if base_blob is not None else None
+
+    candidates = _candidates(src, base_src, staging)
+    best = min(candidates, key=lambda c: c[2])
+    for c in candidates:
+        if c is not best:
+            os.remove(c[1])
+
+    enc, path, stored = best
+    new_base = base if enc == "bsdiff" else None
+    # the plain copy is deleted on swap, so prove the encoding first
+    if 1 - stored / max(size, 1) < bar or not _verify(enc, new_base, path, checksum) \
+            or not _swap(checksum, encoding, enc, new_base, path, stored):
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    state[checksum] = (enc, new_base)
+    return "encoded", size - stored
+
+def rebalance(limit: int = None):
+    """Move blobs between plain and encoded storage.
+
+    Blobs of latest versions, and blobs read REBALANCE_HOT_READS times
+    or more, stay plain. For the rest the smaller of a zlib copy and a
+    bsdiff patch against the next newer version is kept if it saves
+    enough: the bar starts at REBALANCE_MIN_SAVING and rises with the
+    blob's downloads + previews, reaching 100% at REBALANCE_HOT_READS.
+    Each blob is switched in its own short write transaction.
+    """
+    with read_session() as s:
+        order, bases, reads, latest, state = _plan(s)
+
+    staging = staging_dir()
+    os.makedirs(staging, exist_ok=True)
+    result = {"encoded": 0, "restored": 0, "saved": 0, "failed": 0}
+
+    for checksum in order[:limit]:
+        if checksum not in state:
+            continue
+        share = min(reads[checksum] / settings.REBALANCE_HOT_READS, 1)
+        bar = settings.REBALANCE_MIN_SAVING + (1 - settings.REBALANCE_MIN_SAVING) * share
+        keep_raw = checksum in latest or share >= 1
+        try:
+            done = _rebalance_one(checksum, state[checksum][0], bases[checksum], bar, keep_raw,
+                                  state, staging)
+        except Exception:
+            log.exception("rebalancing blob %s failed", checksum)
+            result["failed"] += 1
+            continue
+        if done:
+            result[done[0]] += 1
+            result["saved"] += done[1]
+            if done[0] == "restored":
+                state[checksum] = ("raw", None)
+
+    return result
+
+async def rebalance_forever():
+    while True:
+        await asyncio.sleep(settings.REBALANCE_INTERVAL)
+        try:
+            await asyncio.to_thread(rebalance)
+        except Exception:
+            log.exception("storage rebalance failed")
+
+# ============================================================
+# GARBAGE COLLECTION
+# ============================================================
+def gc(session: Session, grace_seconds: int = 3600):
+    """Drop unreferenced blobs and files left behind by failed uploads.
+
+    Reference counts are first recomputed from the version table so a
+    crash between the file move and the commit cannot leak or strand
+    blobs. Files younger than grace_seconds are left alone, since they
+    may belong to an upload that is still in flight.
+    Must run inside deps.write_session().
+    """
+    removed = {"blobs": 0, "orphans": 0, "staging": 0, "materialized": 0, "sessions": 0}
+    cutoff = time.time() - grace_seconds
+
+    refs = dict(session.exec(
+        select(HandoutVersion.checksum, func.count())
+        .where(HandoutVersion.checksum.is_not(None))
+        .group_by(HandoutVersion.checksum)
+    ).all())
+
+    # delta bases must outlive the blobs patched against them
+    bases = set(session.exec(select(Blob.base_checksum).where(Blob.base_checksum.is_not(None))).all())
+
+    known = set()
+    for b in session.exec(select(Blob)).all():
+        b.refcount = refs.get(b.checksum, 0)
+        if b.refcount == 0 and b.checksum not in bases \
+                and b.created_at.replace(tzinfo=timezone.utc).timestamp() < cutoff:
+            if os.path.exists(stored_path(b)):
+                os.remove(stored_path(b))
+            session.delete(b)
+            removed["blobs"] += 1
+            continue
+        session.add(b)
+        known.add(os.path.normpath(stored_path(b)))
+
+    for root, _, files in os.walk(blob_dir()):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.normpath(path) not in known and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed["orphans"] += 1
+
+    if os.path.isdir(staging_dir()):
+        for name in os.listdir(staging_dir()):
+            path = os.path.join(staging_dir(), name)
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed["staging"] += 1
+
+    # rebuilt copies of encoded blobs nobody has read for a while
+    ttl_cutoff = time.time() - settings.MATERIALIZED_TTL
+    for root, _, files in os.walk(materialized_dir()):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.getmtime(path) < ttl_cutoff:
+                os.remove(path)
+                removed["materialized"] += 1
+
+    # abandoned resumable uploads (routers/uploads.py)
+    sessions = os.path.join(settings.STORAGE_PATH, "sessions")
+    session_cutoff = time.time() - max(grace_seconds, settings.UPLOAD_SESSION_TTL)
+    if os.path.isdir(sessions):
+        for name in os.listdir(sessions):
+            path = os.path.join(sessions, name)
+            if os.path.getmtime(path) < session_cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                removed["sessions"] += 1
+
+    return removed
+
+
+if __name__ == "__main__":
+    import sys
+    from app.deps import init_db
+
+    if sys.argv[1:] not in (["gc"], ["rebalance"]):
+        sys.exit("usage: python -m app.services.blob_service gc|rebalance")
+
+    init_db()
+    if sys.argv[1] == "rebalance":
+        print(rebalance())
+    else:
+        with write_session() as s:
+            print(gc(s))
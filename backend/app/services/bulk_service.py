@@ -0,0 +1,186 @@
+# backend/app/services/bulk_service.py
+"""Bulk import of many files and streaming export of whole subjects."""
+import os
+import re
+import json
+import zipfile
+from fastapi import HTTPException
+from sqlmodel import select
+from app.config import get_settings
+from app.deps import read_session, write_session
+from app.models.handout import Handout
+from app.models.version import HandoutVersion
+from app.services import version_service
+from app.utils import file_utils
+
+settings = get_settings()
+
+MANIFEST = "manifest.json"
+OOXML_EXT = {".docx": file_utils.DOCX, ".pptx": file_utils.PPTX, ".pdf": file_utils.PDF}
+
+# ============================================================
+# IMPORT
+# ============================================================
+def parse_manifest(raw):
+    """manifest: [{"file": ..., "subject": ..., "title": ...}] -> {file: entry}"""
+    try:
+        entries = json.loads(raw)
+        return {e["file"]: e for e in entries}
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(400, "Invalid manifest")
+
+def describe(name, manifest, default_subject):
+    """Work out (subject, title) for one file.
+
+    The manifest wins; otherwise "Subject/Title.pdf" inside an archive,
+    or the form's subject and the file name without its extension.
+    """
+    entry = manifest.get(name, {})
+    parts = [p for p in name.split("/") if p]
+    stem = os.path.splitext(parts[-1])[0] if parts else name
+    subject = entry.get("subject") or (parts[-2] if len(parts) > 1 else default_subject)
+    title = entry.get("title") or stem
+    return subject, title
+
+def discard(items):
+    for item in items:
+        path = item.get("tmp_path")
+        if path and os.path.exists(path):
+            os.remove(path)
+
+def stage_zip(fileobj, default_subject=None, manifest=None):
+    """Extract a ZIP member by member into staging files.
+
+    Returns one item per file; failed members carry an "error" instead of
+    a staged path. The whole archive fails with 413 if it unpacks to more
+    than BULK_MAX_EXTRACTED. Runs blocking I/O, call it from a thread.
+    """
+    try:
+        zf = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise HTTPException(400, "Not a ZIP archive")
+
+    with zf:
+        members = [m for m in zf.infolist() if not m.is_dir()]
+        if manifest is None and MANIFEST in zf.namelist():
+            manifest = parse_manifest(zf.read(MANIFEST))
+        members = [m for m in members if m.filename != MANIFEST]
+        if len(members) > settings.BULK_MAX_FILES:
+            raise HTTPException(413, f"At most {settings.BULK_MAX_FILES} files per import")
+        if sum(m.file_size for m in members) > settings.BULK_MAX_EXTRACTED:
+            raise HTTPException(413, "Archive unpacks to more than the import limit")
+
+        items = []
+        written = 0
+        for m in members:
+            name = m.filename
+            if os.path.basename(name).startswith(".") or name.startswith("__MACOSX/"):
+                continue
+            # sizes in the directory can lie, so also stop on what is written
+            left = settings.BULK_MAX_EXTRACTED - written
+            item = {"file": name}
+            item["subject"], item["title"] = describe(name, manifest or {}, default_subject)
+            try:
+                if not item["subject"]:
+                    raise HTTPException(400, "No subject for file")
+                # the declared size is only a hint; save_stream enforces the cap
+                if m.file_size > settings.MAX_UPLOAD_SIZE:
+                    raise HTTPException(413, "File too large")
+                if left <= 0:
+                    raise HTTPException(413, "File too large")
+                declared = OOXML_EXT.get(os.path.splitext(name)[1].lower())
+                with zf.open(m) as src:
+                    item["tmp_path"], item["checksum"], item["size"], item["mime"] = \
+                        file_utils.save_stream(src, name, declared,
+                                               max_size=min(settings.MAX_UPLOAD_SIZE, left))
+                written += item["size"]
+            except HTTPException as e:
+                if e.status_code == 413 and m.file_size <= settings.MAX_UPLOAD_SIZE \
+                        and left < settings.MAX_UPLOAD_SIZE:
+                    discard(items)
+                    raise HTTPException(413, "Archive unpacks to more than the import limit")
+                item["error"] = e.detail
+            items.append(item)
+    return items
+
+async def stage_uploads(files, default_subject=None, manifest=None):
+    items = []
+    for f in files:
+        item = {"file": f.filename}
+        item["subject"], item["title"] = describe(f.filename, manifest or {}, default_subject)
+        try:
+            if not item["subject"]:
+                raise HTTPException(400, "No subject for file")
+            item["tmp_path"], item["checksum"], item["size"], item["mime"] = \
+                await file_utils.save_file(f)
+        except HTTPException as e:
+            item["error"] = e.detail
+        items.append(item)
+    return items
+
+def record_batch(items, uploaded_by):
+    """Create every staged file's handout/version in one transaction.
+
+    Each file gets its own savepoint, so one bad record is reported
+    without rolling back the rest of the batch.
+    """
+    results = []
+    with write_session() as s:
+        for item in items:
+            result = {"file": item["file"], "subject": item["subject"], "title": item["title"]}
+            if "error" in item:
+                results.append({**result, "status": "error", "message": item["error"]})
+                continue
+            try:
+                with s.begin_nested():
+                    handout, v, created = version_service.add_blob_upload(
+                        s, item["subject"], item["title"], os.path.basename(item["file"]),
+                        item["tmp_path"], item["checksum"], item["size"], item["mime"],
+                        uploaded_by,
+                    )
+                results.append({
+                    **result, "status": "ok", "handout_id": handout.id,
+                    "version_id": v.id, "version": v.version, "created": created,
+                })
+            except Exception as e:
+                discard([item])
+                results.append({**result, "status": "error", "message": str(e)})
+    return results
+
+# ============================================================
+# EXPORT
+# ============================================================
+def safe_name(name: str):
+    name = re.sub(r'[\\/:*?"<>|\x00-\x1f]+', "_", name).strip(" .")
+    return name or "untitled"
+
+def export_entries(subject: str, all_versions: bool = False):
+    """(arcname, path, mtime) for every file in a subject, in title order.
+
+    Rows are fetched in batches as the archive is written, so even a
+    huge subject never sits in memory at once.
+    """
+    with read_session() as s:
+        query = (
+            select(Handout, HandoutVersion)
+            .join(HandoutVersion, HandoutVersion.handout_id == Handout.id)
+            .where(Handout.subject == subject)
+            .order_by(Handout.title_key, HandoutVersion.version.desc())
+        )
+        if not all_versions:
+            query = query.where(HandoutVersion.version == Handout.latest_version)
+
+        used = set()
+        for h, v in s.exec(query.execution_options(yield_per=200)):
+            ext = os.path.splitext(v.filename)[1]
+            base = safe_name(h.title)
+            name = f"{base}/v{v.version}{ext}" if all_versions else f"{base}{ext}"
+            # titles are unique per subject, but not after sanitising
+            n = 2
+            while name in used:
+                name = f"{base} ({n})/v{v.version}{ext}" if all_versions else f"{base} ({n}){ext}"
+                n += 1
+            used.add(name)
+            path = version_service.local_path(s, v)
+            if os.path.exists(path):
+                yield name, path, v.created_at
@@ -1,25 +1,137 @@
 # backend/app/services/handout_service.py
+from datetime import datetime
+from sqlalchemy import DateTime, Integer, and_, or_, func
 from sqlmodel import Session, select
 from app.models.handout import Handout
+from app.models.subject import Subject
+from app.models.version import HandoutVersion  # noqa: F401 (relationship target)
+from app.services import metadata_cache
+from app.utils import listing
 
-def get_handout_by_id(session: Session, hid: str, owner: str):
-    h = session.exec(select(Handout).where(Handout.id == hid)).first()
+# sort name -> (columns, descending?) for keyset pagination
+HANDOUT_SORTS = {
+    "oldest": ((Handout.created_at, Handout.id), (False, False)),
+    "newest": ((Handout.created_at, Handout.id), (True, True)),
+    "title": ((Handout.title_key, Handout.id), (False, False)),
+    # a handout's version count is its latest_version
+    "versions": ((Handout.latest_version, Handout.id), (True, False)),
+}
+
+SUBJECT_SORTS = {
+    "name": ((Subject.name,), (False,)),
+    "count": ((Subject.handout_count, Subject.name), (True, False)),
+}
+
+def handout_dict(h: Handout):
+    return {
+        "id": h.id,
+        "title": h.title,
+        "subject": h.subject,
+        "latest_version": h.latest_version,
+        "created_at": h.created_at.isoformat(),
+    }
+
+def _encode(v):
+    return v.isoformat() if isinstance(v, datetime) else v
+
+def _decode(col, v):
+    if isinstance(col.type, DateTime):
+        return datetime.fromisoformat(v)
+    if not isinstance(v, int if isinstance(col.type, Integer) else str):
+        raise TypeError(f"{col.key} key of the wrong type")
+    return v
+
+def keyset(query, sort, after=None):
+    """Order query by sort and start it just after the row key `after`."""
+    cols, desc = sort
+    if after is not None:
+        # cursors come from clients, so the key may not fit the sort
+        if len(after) != len(cols):
+            raise listing.invalid_cursor()
+        try:
+            after = [_decode(c, v) for c, v in zip(cols, after)]
+        except (ValueError, TypeError):
+            raise listing.invalid_cursor()
+        # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y), per column direction
+        terms = []
+        for i, (c, d) in enumerate(zip(cols, desc)):
+            eq = [cols[j] == after[j] for j in range(i)]
+            terms.append(and_(*eq, c < after[i] if d else c > after[i]))
+        query = query.where(or_(*terms))
+    return query.order_by(*(c.desc() if d else c for c, d in zip(cols, desc)))
+
+def page(session: Session, query, sort, limit, after, to_dict):
+    """Run a keyset query; returns (items, key of last row or None)."""
+    cols, _ = sort
+    rows = session.exec(keyset(query, sort, after).limit(limit + 1)).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    next_key = None
+    if more:
+        next_key = [_encode(getattr(rows[-1], c.key)) for c in cols]
+    return [to_dict(r) for r in rows], next_key
+
+def subject_dict(s: Subject):
+    return {"id": s.name, "count": s.handout_count}
+
+def list_subjects(session: Session, sort="name", limit=1000, after=None):
+    return page(session, select(Subject), SUBJECT_SORTS[sort], limit, after, subject_dict)
+
+def subjects_state(session: Session):
+    """(generation sum, subject count, last change) for the /subjects ETag."""
+    return session.exec(
+        select(func.coalesce(func.sum(Subject.generation), 0), func.count(), func.max(Subject.updated_at))
+    ).one()
+
+def get_subject(session: Session, name: str):
+    return session.get(Subject, name)
+
+def list_handouts(session: Session, subject: str, sort="oldest", limit=1000, after=None):
+    query = select(Handout).where(Handout.subject == subject)
+    return page(session, query, HANDOUT_SORTS[sort], limit, after, handout_dict)
+
+def get_handout_by_id(session: Session, hid: str, owner: str = None):
+    h = session.get(Handout, hid)
     if not h:
         raise Exception("Handout not found")
-    if h.owner_id != owner:
+    if owner is not None and h.owner_id != owner:
         raise Exception("Not allowed")
     return h
 
-def get_or_create(session: Session, title: str, owner: str, subject: str = None):
-    h = session.exec(
-        select(Handout).where(Handout.title == title, Handout.owner_id == owner)
+def find_by_title(session: Session, subject: str, title: str):
+    return session.exec(
+        select(Handout).where(
+            Handout.subject == subject,
+            Handout.title_key == title.lower(),
+        )
     ).first()
 
+def touch_subject(session: Session, subject: str, new_handout: bool = False):
+    """Record a change in a subject. Must run inside deps.write_session()."""
+    s = session.get(Subject, subject)
+    if not s:
+        s = Subject(name=subject)
+    if new_handout:
+        s.handout_count += 1
+    s.generation += 1
+    s.updated_at = datetime.utcnow()
+    session.add(s)
+    metadata_cache.touched(session, subject)
+    return s
+
+def get_or_create(session: Session, title: str, owner: str, subject: str = None):
+    """Return (handout, created). Must run inside deps.write_session()."""
+    h = find_by_title(session, subject, title)
     if h:
-        return h
+        return h, False
 
-    h = Handout(title=title, owner_id=owner, subject=subject)
+    h = Handout(
+        title=title,
+        title_key=title.lower(),
+        owner_id=owner,
+        subject=subject,
+        latest_version=0,
+    )
     session.add(h)
-    session.commit()
-    session.refresh(h)
-    return h
+    session.flush()
+    return h, True
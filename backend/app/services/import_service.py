@@ -0,0 +1,87 @@
+# backend/app/services/import_service.py
+"""One-shot importer from the legacy handout_data.json store.
+
+    python -m app.services.import_service [path/to/handout_data.json]
+"""
+import os
+import sys
+import json
+from datetime import datetime
+from sqlmodel import Session, select, func
+from app.models.handout import Handout
+from app.models.version import HandoutVersion
+from app.models.subject import Subject
+from app.services import metadata_cache
+
+def import_json(session: Session, path: str):
+    """Copy subjects, handouts and versions from the JSON file, keeping ids.
+
+    Rows that already exist are skipped, so re-running is harmless.
+    Returns a count of inserted rows per table.
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+
+    counts = {"subjects": 0, "handouts": 0, "versions": 0}
+    handout_ids = set(session.exec(select(Handout.id)).all())
+    version_ids = set(session.exec(select(HandoutVersion.id)).all())
+
+    for hid, h in data.get("handouts", {}).items():
+        if hid in handout_ids:
+            continue
+        session.add(Handout(
+            id=hid,
+            subject=h["subject"],
+            title=h["title"],
+            title_key=h["title"].lower(),
+            latest_version=h.get("latest_version", 1),
+        ))
+        handout_ids.add(hid)
+        counts["handouts"] += 1
+
+    for vid, v in data.get("versions", {}).items():
+        if vid in version_ids or v["handout_id"] not in handout_ids:
+            continue
+        session.add(HandoutVersion(
+            id=vid,
+            handout_id=v["handout_id"],
+            version=v["version"],
+            filename=os.path.basename(v["file_path"]),
+            file_path=v["file_path"],
+            file_size=os.path.getsize(v["file_path"]) if os.path.exists(v["file_path"]) else 0,
+        ))
+        counts["versions"] += 1
+
+    session.flush()
+
+    # recount instead of trusting the JSON lists, which could drift
+    for name in data.get("subjects", {}):
+        n = session.exec(
+            select(func.count()).select_from(Handout).where(Handout.subject == name)
+        ).one()
+        s = session.get(Subject, name)
+        if not s:
+            s = Subject(name=name)
+            counts["subjects"] += 1
+        s.handout_count = n
+        s.updated_at = datetime.utcnow()
+        session.add(s)
+        metadata_cache.touched(session, name)
+
+    return counts
+
+def import_if_empty(session: Session, path: str):
+    """Run the import once, on a database that has no handouts yet."""
+    if not os.path.exists(path):
+        return None
+    if session.exec(select(Handout.id).limit(1)).first() is not None:
+        return None
+    return import_json(session, path)
+
+
+if __name__ == "__main__":
+    from app.deps import init_db, write_session
+
+    init_db()
+    with write_session() as s:
+        print(import_json(s, sys.argv[1] if len(sys.argv) > 1 else "handout_data.json"))
@@ -0,0 +1,204 @@
+# backend/app/services/ingest_worker.py
+"""Runs queued ingestion jobs off the request path.
+
+CPU-bound stages (text extraction, model inference) go to a process pool
+of INGEST_WORKERS processes; the cheap finishing stage that touches
+SQLite and Qdrant stays in this process. Results of the heavy stage are
+written under STORAGE_PATH/derived/<checksum>, so identical bytes are
+only ever extracted and embedded once no matter how many versions share
+them.
+"""
+import os
+import json
+import asyncio
+import logging
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.config import get_settings
+from app.deps import read_session, write_session
+from app.services import job_queue, search_service, version_service, thumbnail_service
+
+settings = get_settings()
+log = logging.getLogger(__name__)
+
+_pool = None
+_loop = None
+_wake = None
+_task = None
+
+def derived_dir(key: str):
+    return os.path.join(settings.STORAGE_PATH, "derived", key[:2], key)
+
+# ============================================================
+# HEAVY STAGE (runs in pool processes)
+# ============================================================
+def compute_index(path: str, mime: str, out_dir: str):
+    import numpy as np
+
+    chunks_path = os.path.join(out_dir, "chunks.json")
+    if os.path.exists(chunks_path):
+        return out_dir
+
+    chunks = search_service.chunk_text(search_service.extract_text(path, mime))
+    vectors = search_service.embed([c["text"] for c in chunks]) if chunks else np.zeros((0, 0))
+
+    # chunks.json is written last and marks the artifacts as complete
+    os.makedirs(out_dir, exist_ok=True)
+    tmp = f".{os.getpid()}.tmp"
+    np.save(os.path.join(out_dir, "vectors" + tmp + ".npy"), vectors)
+    os.replace(os.path.join(out_dir, "vectors" + tmp + ".npy"), os.path.join(out_dir, "vectors.npy"))
+    with open(chunks_path + tmp, "w") as f:
+        json.dump(chunks, f)
+    os.replace(chunks_path + tmp, chunks_path)
+    return out_dir
+
+# ============================================================
+# FINISHING STAGE (runs in this process, in a thread)
+# ============================================================
+def finish_index(version_id: str, out_dir: str):
+    import numpy as np
+
+    with open(os.path.join(out_dir, "chunks.json"), "r") as f:
+        chunks = json.load(f)
+    vectors = np.load(os.path.join(out_dir, "vectors.npy"))
+
+    with write_session() as s:
+        v = version_service.get_version_by_id(s, version_id)
+        if not v:
+            return
+        payload = version_service.search_payload(s, v)
+        if chunks:
+            v.summary = version_service.simple_summary(chunks[0]["text"])
+            s.add(v)
+
+    if chunks:
+        search_service.index_chunks(payload, chunks, vectors)
+
+def finish_thumbnails(version_id: str, out_dir: str):
+    # images are found by checksum, nothing to record; just keep the
+    # disk tier within budget
+    thumbnail_service.note_written(out_dir)
+
+# kind -> (heavy stage, finishing stage, output directory for a checksum)
+HANDLERS = {
+    "index": (compute_index, finish_index, derived_dir),
+    "thumbnail": (thumbnail_service.render, finish_thumbnails, thumbnail_service.thumb_dir),
+}
+
+# ============================================================
+# LOOP
+# ============================================================
+def _claim():
+    with write_session() as s:
+        jobs = job_queue.claim(s, settings.JOB_BATCH_SIZE)
+        return [(j.id, j.version_id, j.checksum, j.kind) for j in jobs]
+
+def _source(version_id: str):
+    with read_session() as s:
+        v = version_service.get_version_by_id(s, version_id)
+        if not v:
+            raise Exception("Version not found")
+        return version_service.local_path(s, v), v.file_type
+
+def _done(job_id: int, error: str = None):
+    with write_session() as s:
+        if error is None:
+            job_queue.complete(s, job_id)
+        else:
+            job_queue.fail(s, job_id, error)
+
+def _release(job_id: int):
+    with write_session() as s:
+        job_queue.release(s, job_id)
+
+def _new_pool():
+    # spawn: forking a process that may already hold torch / sqlite
+    # handles is asking for trouble
+    return ProcessPoolExecutor(
+        max_workers=settings.INGEST_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+def _replace_pool(broken):
+    """Swap in a fresh pool once one has lost a process (OOM kill, crash).
+
+    Every job in flight on the broken pool fails at once; only the first
+    to get here replaces it.
+    """
+    global _pool
+    if _pool is broken:
+        broken.shutdown(wait=False, cancel_futures=True)
+        _pool = _new_pool()
+
+async def run_job(job_id: int, version_id: str, checksum: str, kind: str):
+    loop = asyncio.get_running_loop()
+    pool = _pool
+    try:
+        compute, finish, output = HANDLERS[kind]
+        path, mime = await asyncio.to_thread(_source, version_id)
+        out_dir = output(checksum or version_id)
+        # _pool is None when INGEST_WORKERS=0: use the default thread pool
+        await loop.run_in_executor(pool, compute, path, mime, out_dir)
+        await asyncio.to_thread(finish, version_id, out_dir)
+    except BrokenProcessPool:
+        # a dead worker says nothing about this job: retry it on a new
+        # pool without spending one of its attempts
+        log.warning("ingest pool broke under job %s (%s); restarting it", job_id, kind)
+        _replace_pool(pool)
+        await asyncio.to_thread(_release, job_id)
+    except Exception:
+        log.exception("ingest job %s (%s) failed", job_id, kind)
+        await asyncio.to_thread(_done, job_id, traceback.format_exc())
+    else:
+        await asyncio.to_thread(_done, job_id)
+
+def _requeue_stale():
+    with write_session() as s:
+        job_queue.requeue_stale(s)
+
+async def run_forever():
+    await asyncio.to_thread(_requeue_stale)
+
+    while True:
+        try:
+            jobs = await asyncio.to_thread(_claim)
+        except Exception:
+            log.exception("claiming ingest jobs failed")
+            jobs = []
+
+        if not jobs:
+            _wake.clear()
+            try:
+                await asyncio.wait_for(_wake.wait(), settings.JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        await asyncio.gather(*(run_job(*j) for j in jobs))
+
+def notify():
+    """Wake the loop early; safe to call from any thread."""
+    if _loop is not None:
+        _loop.call_soon_threadsafe(_wake.set)
+
+async def start():
+    global _pool, _loop, _wake, _task
+    if settings.INGEST_WORKERS > 0:
+        _pool = _new_pool()
+    else:
+        log.warning("INGEST_WORKERS=0: ingestion runs in this process and will slow requests down")
+    _loop = asyncio.get_running_loop()
+    _wake = asyncio.Event()
+    _task = asyncio.create_task(run_forever())
+
+async def stop():
+    global _pool, _loop, _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
+    _loop = None
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
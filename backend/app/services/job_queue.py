@@ -0,0 +1,96 @@
+# backend/app/services/job_queue.py
+"""Durable post-upload job queue, stored next to the metadata in SQLite.
+
+Jobs are inserted in the same transaction as the version they belong
+to, so a version can never exist without its follow-up work queued.
+"""
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
+from app.config import get_settings
+from app.models.job import IngestJob
+
+settings = get_settings()
+
+# kinds queued for every new version
+DEFAULT_KINDS = ("index", "thumbnail")
+
+def enqueue(session: Session, version_id: str, checksum: str, kinds=DEFAULT_KINDS):
+    """Queue work for a version. Must run inside deps.write_session()."""
+    for kind in kinds:
+        exists = session.exec(
+            select(IngestJob).where(IngestJob.version_id == version_id, IngestJob.kind == kind)
+        ).first()
+        if not exists:
+            session.add(IngestJob(version_id=version_id, checksum=checksum, kind=kind))
+
+def claim(session: Session, limit: int):
+    """Mark up to limit runnable jobs as running and return them."""
+    now = datetime.utcnow()
+    jobs = session.exec(
+        select(IngestJob)
+        .where(IngestJob.status == "pending", IngestJob.run_after <= now)
+        .order_by(IngestJob.id)
+        .limit(limit)
+    ).all()
+    for j in jobs:
+        j.status = "running"
+        j.attempts += 1
+        j.updated_at = now
+        session.add(j)
+    return jobs
+
+def complete(session: Session, job_id: int):
+    j = session.get(IngestJob, job_id)
+    j.status = "done"
+    j.error = None
+    j.updated_at = datetime.utcnow()
+    session.add(j)
+
+def fail(session: Session, job_id: int, error: str):
+    """Back off exponentially; give up after JOB_MAX_ATTEMPTS tries."""
+    j = session.get(IngestJob, job_id)
+    now = datetime.utcnow()
+    j.error = error[-2000:]
+    j.updated_at = now
+    if j.attempts >= settings.JOB_MAX_ATTEMPTS:
+        j.status = "failed"
+    else:
+        j.status = "pending"
+        j.run_after = now + timedelta(seconds=settings.JOB_RETRY_BASE * 2 ** (j.attempts - 1))
+    session.add(j)
+
+def release(session: Session, job_id: int):
+    """Put a claimed job back as if it had never been claimed.
+
+    For when the job never really ran: its worker process died under it,
+    through no fault of its own.
+    """
+    j = session.get(IngestJob, job_id)
+    j.status = "pending"
+    j.attempts = max(j.attempts - 1, 0)
+    j.run_after = j.updated_at = datetime.utcnow()
+    session.add(j)
+
+def requeue_stale(session: Session):
+    """Put back jobs whose worker died mid-run (crash, redeploy)."""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+    jobs = session.exec(
+        select(IngestJob).where(IngestJob.status == "running", IngestJob.updated_at < cutoff)
+    ).all()
+    for j in jobs:
+        j.status = "pending"
+        session.add(j)
+    return len(jobs)
+
+def version_status(session: Session, version_id: str):
+    jobs = session.exec(select(IngestJob).where(IngestJob.version_id == version_id)).all()
+    return [
+        {
+            "kind": j.kind,
+            "status": j.status,
+            "attempts": j.attempts,
+            "error": j.error,
+            "updated_at": j.updated_at.isoformat(),
+        }
+        for j in jobs
+    ]
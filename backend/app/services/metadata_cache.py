@@ -0,0 +1,181 @@
+# backend/app/services/metadata_cache.py
+"""Read-through, process-local cache of listing metadata.
+
+Holds small __slots__ records for subjects, handouts and versions, plus
+the finished JSON of /subjects and /subject/{name} pages, so a repeat
+request does neither the query nor the serialisation.
+
+Only subjects (counts, change counters) and the listings built from
+them change after creation; handout and version records keep just the
+fields that never do, so they need no invalidation. Changes are tracked
+with generation counters in a memory-mapped file every worker shares:
+touched() notes a subject inside a write, and once deps.write_session()
+has committed it, the subject's slot and slot 0 ("any subject") are
+bumped. Cached entries remember the generation they were read at and
+are ignored once it moves. Subjects hash into a fixed number of slots,
+so a collision costs an extra miss, never a stale answer.
+"""
+import zlib
+from sqlmodel import Session
+from fastapi import Request
+from fastapi.responses import Response
+from app.config import get_settings
+from app.deps import DB_PATH, on_commit
+from app.models.handout import Handout
+from app.models.subject import Subject
+from app.models.version import HandoutVersion
+from app.utils import listing, metrics
+from app.utils.byte_cache import ByteCache
+from app.utils.shared_counter import SharedCounters
+
+settings = get_settings()
+
+# rough footprint of one record, for the byte budget
+RECORD_SIZE = 256
+
+_cache = ByteCache(settings.METADATA_CACHE_BYTES)
+_generations = SharedCounters(DB_PATH + ".generations", settings.METADATA_GENERATION_SLOTS)
+
+LOOKUPS = metrics.Counter("metadata_cache_lookups_total", "Metadata cache lookups", ("kind", "result"))
+metrics.Gauge("metadata_cache_bytes", "Approximate bytes held by the metadata cache",
+              fn=lambda: _cache.size)
+
+# ============================================================
+# RECORDS
+# ============================================================
+class SubjectRecord:
+    __slots__ = ("name", "handout_count", "generation", "updated_at")
+
+    def __init__(self, s: Subject):
+        self.name = s.name
+        self.handout_count = s.handout_count
+        self.generation = s.generation
+        self.updated_at = s.updated_at
+
+
+# Handouts and versions are never renamed, moved or deleted once
+# created (latest_version and the view counters, which do change, are
+# not copied), so these two records need no generation check.
+class HandoutRecord:
+    __slots__ = ("id", "subject", "title", "created_at")
+
+    def __init__(self, h: Handout):
+        self.id = h.id
+        self.subject = h.subject
+        self.title = h.title
+        self.created_at = h.created_at
+
+
+class VersionRecord:
+    # everything the download / preview / thumbnail paths read; the
+    # counters are left out, they change on every view
+    __slots__ = ("id", "handout_id", "version", "filename", "file_path",
+                 "file_type", "file_size", "checksum", "created_at")
+
+    def __init__(self, v: HandoutVersion):
+        for name in self.__slots__:
+            setattr(self, name, getattr(v, name))
+
+# ============================================================
+# GENERATIONS
+# ============================================================
+ANY_SUBJECT = 0
+
+def _slot(subject: str):
+    # crc32, not hash(): every worker must agree on the slot
+    return 1 + zlib.crc32(subject.encode()) % (settings.METADATA_GENERATION_SLOTS - 1)
+
+def generation(subject: str = None):
+    return _generations.get(ANY_SUBJECT if subject is None else _slot(subject))
+
+def touched(session: Session, subject: str):
+    """Invalidate subject once this session commits. Call inside the write."""
+    session.info.setdefault("touched_subjects", set()).add(subject)
+
+@on_commit
+def _bump(session):
+    # still under deps.write_lock, which serialises the bumps. Subjects
+    # of a writer whose savepoint rolled back stay in the set: one extra
+    # miss, where dropping them could drop its batch-mates' too
+    subjects = session.info.pop("touched_subjects", None)
+    if subjects:
+        for subject in subjects:
+            _generations.bump(_slot(subject))
+        _generations.bump(ANY_SUBJECT)
+
+# ============================================================
+# LOOKUPS
+# ============================================================
+_MISSING = object()
+
+def _lookup(kind: str, key, gen=None):
+    entry = _cache.get((kind, key))
+    if entry is not None and entry[0] == gen:
+        LOOKUPS.inc(kind, "hit")
+        return entry[1]
+    LOOKUPS.inc(kind, "miss")
+    return _MISSING
+
+def subject(session: Session, name: str):
+    """SubjectRecord for name, or None if there is no such subject."""
+    # read the generation before the row: a commit in between then only
+    # makes this entry look older than it is
+    gen = generation(name)
+    rec = _lookup("subject", name, gen)
+    if rec is _MISSING:
+        s = session.get(Subject, name)
+        rec = SubjectRecord(s) if s else None
+        _cache.put(("subject", name), (gen, rec), size=RECORD_SIZE)
+    return rec
+
+def handout(session: Session, hid: str):
+    rec = _lookup("handout", hid)
+    if rec is _MISSING:
+        h = session.get(Handout, hid)
+        if not h:
+            return None
+        rec = HandoutRecord(h)
+        _cache.put(("handout", hid), (None, rec), size=RECORD_SIZE)
+    return rec
+
+def version(session: Session, vid: str):
+    rec = _lookup("version", vid)
+    if rec is _MISSING:
+        v = session.get(HandoutVersion, vid)
+        if not v:
+            return None
+        rec = VersionRecord(v)
+        _cache.put(("version", vid), (None, rec), size=RECORD_SIZE)
+    return rec
+
+# ============================================================
+# LISTING RESPONSES
+# ============================================================
+def listing_response(request: Request, key, subject: str, validators, build):
+    """Serve a listing page from memory, or build it and keep it.
+
+    validators() returns the page's (etag, last_modified) cheaply, so a
+    miss can still answer a revalidation with 304 before the listing
+    query runs; build(etag, last_modified) returns the full response.
+    key must cover every query parameter that shapes the page.
+    subject=None ties the entry to every subject.
+    """
+    gen = generation(subject)
+    entry = _lookup("listing", key, gen)
+    if entry is not _MISSING:
+        etag, changed, body, headers = entry
+        if listing.not_modified(request, etag, changed):
+            return listing.not_modified_response(etag, changed)
+        return Response(body, headers=headers)
+
+    etag, changed = validators()
+    if listing.not_modified(request, etag, changed):
+        return listing.not_modified_response(etag, changed)
+    response = build(etag, changed)
+    if response.status_code == 200:
+        entry = (etag, changed, response.body, dict(response.headers))
+        _cache.put(("listing", key), (gen, entry), size=len(response.body) + RECORD_SIZE)
+    return response
+
+def clear():
+    _cache.clear()
@@ -0,0 +1,235 @@
+# backend/app/services/search_service.py
+"""Semantic search over handout contents.
+
+Text is pulled out of each stored version, split into overlapping
+chunks, embedded in batches with sentence-transformers and kept in
+Qdrant (embedded on disk by default, or a server via QDRANT_URL). Every
+point carries subject / handout / version ids so searches can be
+filtered without touching SQLite.
+"""
+import os
+import uuid
+import threading
+from functools import lru_cache
+from app.config import get_settings
+from app.utils.startup_report import timed
+from app.utils.file_utils import PDF, DOCX, PPTX
+from app.utils import metrics
+
+settings = get_settings()
+
+COLLECTION = "handout_chunks"
+
+_model_lock = threading.Lock()
+_client_lock = threading.Lock()
+_model = None
+_client = None
+
+# ============================================================
+# TEXT EXTRACTION
+# ============================================================
+@metrics.timed("search.extract_text")
+def extract_text(path: str, mime: str):
+    """Return [(page_number, text)]; page numbers start at 1."""
+    if mime == PDF:
+        from pypdf import PdfReader
+        reader = PdfReader(path)
+        return [(i + 1, page.extract_text() or "") for i, page in enumerate(reader.pages)]
+
+    if mime == DOCX:
+        import docx
+        doc = docx.Document(path)
+        return [(1, "\n".join(p.text for p in doc.paragraphs))]
+
+    if mime == PPTX:
+        from pptx import Presentation
+        pres = Presentation(path)
+        slides = []
+        for i, slide in enumerate(pres.slides):
+            texts = [s.text_frame.text for s in slide.shapes if s.has_text_frame]
+            slides.append((i + 1, "\n".join(texts)))
+        return slides
+
+    return []
+
+def chunk_text(pages, size: int = None, overlap: int = None):
+    """Split page texts into ~size character windows that overlap slightly."""
+    size = size or settings.SEARCH_CHUNK_CHARS
+    overlap = overlap if overlap is not None else size // 8
+    chunks = []
+    for page, text in pages:
+        text = " ".join(text.split())
+        start = 0
+        while start < len(text):
+            end = min(start + size, len(text))
+            # prefer to cut at a word boundary
+            if end < len(text):
+                space = text.rfind(" ", start + size // 2, end)
+                if space != -1:
+                    end = space
+            chunks.append({"page": page, "text": text[start:end]})
+            if end >= len(text):
+                break
+            start = max(end - overlap, start + 1)
+            # and start the next one on a word too
+            space = text.find(" ", start, end)
+            if space != -1:
+                start = space + 1
+    return chunks
+
+# ============================================================
+# MODEL + VECTOR STORE (created on first use)
+# ============================================================
+def get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                with timed("search.model"):
+                    from sentence_transformers import SentenceTransformer
+                    _model = SentenceTransformer(settings.EMBEDDING_MODEL)
+    return _model
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                with timed("search.qdrant"):
+                    _client = _open_client()
+    return _client
+
+def _open_client():
+    from qdrant_client import QdrantClient, models
+
+    if settings.QDRANT_URL:
+        client = QdrantClient(url=settings.QDRANT_URL)
+    else:
+        client = QdrantClient(path=os.path.join(settings.STORAGE_PATH, "qdrant"))
+    if not client.collection_exists(COLLECTION):
+        client.create_collection(
+            COLLECTION,
+            vectors_config=models.VectorParams(
+                size=get_model().get_sentence_embedding_dimension(),
+                distance=models.Distance.COSINE,
+            ),
+        )
+        # embedded mode scans payloads anyway; indexes only help a server
+        if settings.QDRANT_URL:
+            for field in ("subject", "handout_id", "version_id"):
+                client.create_payload_index(COLLECTION, field, models.PayloadSchemaType.KEYWORD)
+    return client
+
+def close():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+@metrics.timed("search.embed")
+def embed(texts):
+    return get_model().encode(
+        texts, batch_size=settings.EMBED_BATCH_SIZE,
+        normalize_embeddings=True, show_progress_bar=False,
+    )
+
+@lru_cache(maxsize=1024)
+def embed_query(q: str):
+    # popular queries repeat a lot; skip the model for them
+    return tuple(embed([q])[0].tolist())
+
+# ============================================================
+# INDEXING
+# ============================================================
+def point_id(version_id: str, n: int):
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{version_id}#{n}"))
+
+def index_chunks(version: dict, chunks, vectors):
+    """Replace the points of one version with freshly embedded chunks."""
+    from qdrant_client import models
+
+    client = get_client()
+    client.delete(COLLECTION, points_selector=models.FilterSelector(filter=_filter(
+        version_id=version["version_id"],
+    )))
+
+    points = [
+        models.PointStruct(
+            id=point_id(version["version_id"], i),
+            vector=list(map(float, vec)),
+            payload={**version, "page": c["page"], "text": c["text"]},
+        )
+        for i, (c, vec) in enumerate(zip(chunks, vectors))
+    ]
+    for i in range(0, len(points), 256):
+        client.upsert(COLLECTION, points=points[i:i + 256], wait=True)
+    return len(points)
+
+def index_version(version: dict, path: str, mime: str):
+    """Extract, chunk, embed and store one version.
+
+    version is the payload stored with every chunk: version_id,
+    handout_id, version, subject and title.
+    """
+    chunks = chunk_text(extract_text(path, mime))
+    if not chunks:
+        return 0
+    vectors = embed([c["text"] for c in chunks])
+    return index_chunks(version, chunks, vectors)
+
+# ============================================================
+# QUERY
+# ============================================================
+def _filter(**fields):
+    from qdrant_client import models
+    must = [
+        models.FieldCondition(key=k, match=models.MatchValue(value=v))
+        for k, v in fields.items() if v
+    ]
+    return models.Filter(must=must) if must else None
+
+def snippet(text: str, q: str, width: int = 200):
+    # centre the snippet on the first query word that appears verbatim
+    lower = text.lower()
+    for word in q.lower().split():
+        i = lower.find(word)
+        if i != -1:
+            start = max(i - width // 2, 0)
+            return ("..." if start else "") + text[start:start + width] + \
+                ("..." if start + width < len(text) else "")
+    return text[:width] + ("..." if len(text) > width else "")
+
+@metrics.timed("search.query")
+def search(q: str, subject: str = None, handout_id: str = None, limit: int = 10):
+    """Best matching handouts, highest score first.
+
+    Every version is indexed, and versions of one handout are mostly the
+    same text, so hits are grouped by handout (Qdrant returns `limit`
+    distinct groups) and each shows its newest matching version. Within
+    one handout (handout_id given) there is one hit per version instead.
+    """
+    res = get_client().query_points_groups(
+        COLLECTION,
+        query=list(embed_query(q)),
+        query_filter=_filter(subject=subject, handout_id=handout_id),
+        group_by="version_id" if handout_id else "handout_id",
+        group_size=1 if handout_id else settings.SEARCH_GROUP_SIZE,
+        limit=limit,
+        with_payload=True,
+    )
+
+    hits = []
+    for group in res.groups:
+        # ranked by the best chunk; shown as the newest version that matched
+        p = max(group.hits, key=lambda h: (h.payload["version"], h.score))
+        hits.append({
+            "handout_id": p.payload["handout_id"],
+            "version_id": p.payload["version_id"],
+            "version": p.payload["version"],
+            "subject": p.payload["subject"],
+            "title": p.payload["title"],
+            "page": p.payload["page"],
+            "score": group.hits[0].score,
+            "snippet": snippet(p.payload["text"], q),
+        })
+    return hits
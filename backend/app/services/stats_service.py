@@ -0,0 +1,57 @@
+# backend/app/services/stats_service.py
+"""Download / preview counters, buffered in memory and flushed in batches.
+
+A hit only bumps a dict entry; flush() folds everything collected since
+the last flush into one UPDATE per version, so serving a file never
+waits on a metadata write.
+"""
+import asyncio
+import logging
+import threading
+from collections import Counter
+from sqlalchemy import update
+from app.config import get_settings
+from app.deps import write_session
+from app.models.version import HandoutVersion
+
+settings = get_settings()
+
+KINDS = ("downloads", "previews")
+
+_pending = Counter()
+_lock = threading.Lock()
+
+def record(version_id: str, kind: str):
+    with _lock:
+        _pending[(version_id, kind)] += 1
+
+def pending(version_id: str, kind: str):
+    # lets responses include hits that have not been flushed yet
+    return _pending.get((version_id, kind), 0)
+
+def flush():
+    global _pending
+    with _lock:
+        batch, _pending = _pending, Counter()
+    if not batch:
+        return 0
+
+    try:
+        with write_session() as s:
+            for (vid, kind), n in batch.items():
+                col = getattr(HandoutVersion, kind)
+                s.exec(update(HandoutVersion).where(HandoutVersion.id == vid).values({kind: col + n}))
+    except Exception:
+        # put the counts back rather than lose them
+        with _lock:
+            _pending.update(batch)
+        raise
+    return len(batch)
+
+async def flush_forever():
+    while True:
+        await asyncio.sleep(settings.STATS_FLUSH_INTERVAL)
+        try:
+            await asyncio.to_thread(flush)
+        except Exception:
+            logging.getLogger(__name__).exception("flushing download stats failed")
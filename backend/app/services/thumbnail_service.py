@@ -0,0 +1,225 @@
+# backend/app/services/thumbnail_service.py
+"""Page thumbnails and a first-page preview image for every stored file.
+
+Images are rendered by the "thumbnail" ingest job after upload and kept
+under STORAGE_PATH/thumbs/<checksum>/, so versions sharing bytes share
+images. Reads go memory LRU -> disk -> render on the spot (for files
+uploaded before this existed, or evicted since). The disk tier is kept
+under THUMB_DISK_BYTES by dropping the least recently read files first;
+its size is counted in a file every worker shares.
+
+PDFs are rendered with PyMuPDF when it is installed; DOCX / PPTX use
+the thumbnail Office embeds in the file, if there is one.
+"""
+import os
+import json
+import uuid
+import shutil
+import zipfile
+from app.config import get_settings
+from app.services import version_service
+from app.utils import metrics
+from app.utils.byte_cache import ByteCache
+from app.utils.file_lock import FileLock
+from app.utils.shared_counter import SharedCounters
+from app.utils.file_utils import PDF, DOCX, PPTX
+
+settings = get_settings()
+
+MARKER = "pages.json"
+PREVIEW = "preview.jpg"
+
+_memory = ByteCache(settings.THUMB_MEMORY_BYTES)
+# slot 0: bytes on disk; slot 1: 1 once slot 0 has been measured
+DISK_BYTES, MEASURED = 0, 1
+_disk = SharedCounters(os.path.join(settings.STORAGE_PATH, "thumbs.bytes"), 2)
+_disk_lock = FileLock(os.path.join(settings.STORAGE_PATH, "thumbs.lock"))
+
+READS = metrics.Counter("thumbnail_reads_total", "Thumbnail reads by the tier that served them", ("tier",))
+EVICTIONS = metrics.Counter("thumbnail_evictions_total", "Rendered files dropped from the disk tier")
+metrics.Gauge("thumbnail_memory_bytes", "Bytes held by the in-memory thumbnail cache",
+              fn=lambda: _memory.size)
+
+def thumbs_root():
+    return os.path.join(settings.STORAGE_PATH, "thumbs")
+
+def thumb_dir(key: str):
+    return os.path.join(thumbs_root(), key[:2], key)
+
+def page_name(page: int):
+    return f"page-{page}.jpg"
+
+# ============================================================
+# RENDERING
+# ============================================================
+def _pymupdf():
+    # optional: without it PDFs simply get no images
+    try:
+        import pymupdf
+    except ImportError:
+        try:
+            import fitz as pymupdf
+        except ImportError:
+            return None
+    return pymupdf
+
+def _render_pdf(path: str, out: str):
+    pymupdf = _pymupdf()
+    if pymupdf is None:
+        return 0
+    try:
+        doc = pymupdf.open(path, filetype="pdf")
+    except RuntimeError:
+        return 0  # damaged file: no images, like an unsupported type
+    with doc:
+        pages = min(doc.page_count, settings.THUMBNAIL_PAGES)
+        for i in range(pages):
+            page = doc[i]
+            sizes = [(page_name(i + 1), settings.THUMBNAIL_WIDTH)]
+            if i == 0:
+                sizes.append((PREVIEW, settings.PREVIEW_WIDTH))
+            for name, width in sizes:
+                zoom = width / page.rect.width
+                pix = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+                with open(os.path.join(out, name), "wb") as f:
+                    f.write(pix.tobytes("jpeg", jpg_quality=settings.THUMBNAIL_QUALITY))
+    return pages
+
+def _office_thumbnail(path: str, out: str):
+    try:
+        with zipfile.ZipFile(path) as z:
+            names = set(z.namelist())
+            for name in ("docProps/thumbnail.jpeg", "docProps/thumbnail.jpg"):
+                if name in names:
+                    data = z.read(name)
+                    break
+            else:
+                return 0
+    except zipfile.BadZipFile:
+        return 0
+    for name in (PREVIEW, page_name(1)):
+        with open(os.path.join(out, name), "wb") as f:
+            f.write(data)
+    return 1
+
+def render(path: str, mime: str, out_dir: str):
+    """Write the images for one file into out_dir. Safe to run twice.
+
+    Everything goes to a scratch directory that is renamed into place,
+    with pages.json inside it marking a finished render.
+    """
+    if os.path.exists(os.path.join(out_dir, MARKER)):
+        return out_dir
+
+    tmp = f"{out_dir}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(tmp)
+    try:
+        if mime == PDF:
+            pages = _render_pdf(path, tmp)
+        elif mime in (DOCX, PPTX):
+            pages = _office_thumbnail(path, tmp)
+        else:
+            pages = 0
+        with open(os.path.join(tmp, MARKER), "w") as f:
+            json.dump({"pages": pages}, f)
+        try:
+            os.replace(tmp, out_dir)
+        except OSError:
+            pass  # someone else finished first
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return out_dir
+
+# ============================================================
+# DISK TIER
+# ============================================================
+def _size(path: str):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def note_written(out_dir: str):
+    """Account for a new render and evict if the disk tier is over budget."""
+    with _disk_lock:
+        if _disk.get(MEASURED):
+            total = _disk.add(DISK_BYTES, _size(out_dir))
+        else:
+            total = _size(thumbs_root())
+            _disk.set(DISK_BYTES, total)
+            _disk.set(MEASURED, 1)
+        if total <= settings.THUMB_DISK_BYTES:
+            return
+
+        # the running count can drift (two workers rendering the same
+        # file, files removed by hand), so measure before evicting
+        total = _size(thumbs_root())
+        _disk.set(DISK_BYTES, total)
+        if total <= settings.THUMB_DISK_BYTES:
+            return
+
+        # directories are touched on every read, so mtime is last use
+        dirs = []
+        for prefix in os.listdir(thumbs_root()):
+            for key in os.listdir(os.path.join(thumbs_root(), prefix)):
+                d = os.path.join(thumbs_root(), prefix, key)
+                # never the render that is about to be served
+                if not key.endswith(".tmp") and d != out_dir:
+                    dirs.append((os.path.getmtime(d), d))
+        for _, d in sorted(dirs):
+            if total <= settings.THUMB_DISK_BYTES * 0.9:
+                break
+            size = _size(d)
+            shutil.rmtree(d, ignore_errors=True)
+            total = _disk.add(DISK_BYTES, -size)
+            EVICTIONS.inc()
+
+# ============================================================
+# READS
+# ============================================================
+def get_image(session, v, name: str):
+    """Image bytes for a version, or None if it has none.
+
+    The first read of a file that was never rendered (or was evicted)
+    renders it here; later reads come from disk or memory.
+    """
+    key = v.checksum or v.id
+    data = _memory.get((key, name))
+    if data is not None:
+        READS.inc("memory")
+        return data
+
+    d = thumb_dir(key)
+    tier = "disk"
+    if not os.path.exists(os.path.join(d, MARKER)):
+        path = version_service.local_path(session, v)
+        if not os.path.exists(path):
+            return None
+        with metrics.timed("thumbnail.render"):
+            render(path, v.file_type, d)
+        note_written(d)
+        tier = "render"
+
+    try:
+        with open(os.path.join(d, name), "rb") as f:
+            data = f.read()
+        os.utime(d)
+    except FileNotFoundError:
+        READS.inc("missing")
+        return None
+
+    READS.inc(tier)
+    _memory.put((key, name), data)
+    return data
+
+def page_count(v):
+    key = v.checksum or v.id
+    try:
+        with open(os.path.join(thumb_dir(key), MARKER)) as f:
+            return json.load(f)["pages"]
+    except FileNotFoundError:
+        return None  # not rendered yet
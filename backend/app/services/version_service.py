@@ -1,11 +1,33 @@
 # backend/app/services/version_service.py
+import os
 from sqlmodel import Session, select
 from app.models.version import HandoutVersion
+from app.services import handout_service, blob_service, stats_service, job_queue, metadata_cache
+from app.utils import metrics
 
 def simple_summary(text: str):
     text = text or ""
     return text[:250] + "..." if len(text) > 250 else text
 
+def version_id(handout_id: str, vnum: int):
+    return f"{handout_id}_v{vnum}"
+
+def version_dict(v: HandoutVersion):
+    return {
+        "id": v.id,
+        "version_id": v.id,
+        "handout_id": v.handout_id,
+        "version": v.version,
+        "file_path": v.file_path,
+        "filename": v.filename,
+        "file_type": v.file_type,
+        "file_size": v.file_size,
+        "checksum": v.checksum,
+        "created_at": v.created_at.isoformat() if v.created_at else None,
+        "downloads": v.downloads + stats_service.pending(v.id, "downloads"),
+        "previews": v.previews + stats_service.pending(v.id, "previews"),
+    }
+
 def get_next_version(session: Session, handout_id: str):
     last = session.exec(
         select(HandoutVersion)
@@ -14,13 +36,55 @@ def get_next_version(session: Session, handout_id: str):
     ).first()
     return 1 if not last else last.version + 1
 
-def create_version(session: Session, handout, file_path, mime, size, checksum, user_email):
-    vnum = get_next_version(session, handout.id)
+VERSION_SORTS = {
+    "newest": ((HandoutVersion.version,), (True,)),
+    "oldest": ((HandoutVersion.version,), (False,)),
+}
+
+@metrics.timed("version.list")
+def list_versions(session: Session, handout_id: str, sort="newest", limit=1000, after=None):
+    # served straight from the (handout_id, version) index
+    query = select(HandoutVersion).where(HandoutVersion.handout_id == handout_id)
+    return handout_service.page(session, query, VERSION_SORTS[sort], limit, after, version_dict)
+
+def get_version(session: Session, handout_id: str, vnum: int):
+    return session.get(HandoutVersion, version_id(handout_id, vnum))
+
+def get_version_by_id(session: Session, vid: str):
+    return session.get(HandoutVersion, vid)
+
+@metrics.timed("version.local_path")
+def local_path(session: Session, v: HandoutVersion):
+    """A readable file with v's bytes; older blobs may be stored encoded."""
+    if v.checksum and not os.path.exists(v.file_path):
+        b = blob_service.get_blob(session, v.checksum)
+        if b:
+            return blob_service.materialize(session, b)
+    return v.file_path
+
+def search_payload(session: Session, v: HandoutVersion):
+    # what search_service stores with every chunk of this version
+    h = metadata_cache.handout(session, v.handout_id)
+    return {
+        "version_id": v.id,
+        "handout_id": v.handout_id,
+        "version": v.version,
+        "subject": h.subject,
+        "title": h.title,
+    }
+
+def create_version(session: Session, handout, file_path, mime, size, checksum, user_email,
+                   filename=None):
+    # latest_version is only bumped under deps.write_lock, so it is the
+    # authoritative counter and saves a max() lookup per upload
+    vnum = handout.latest_version + 1
     summary = simple_summary(f"Uploaded by {user_email}")
 
     v = HandoutVersion(
+        id=version_id(handout.id, vnum),
         handout_id=handout.id,
         version=vnum,
+        filename=filename or file_path.split("/")[-1],
         file_path=file_path,
         file_type=mime,
         file_size=size,
@@ -29,11 +93,41 @@ def create_version(session: Session, handout, file_path, mime, size, checksum, u
         uploaded_by=user_email
     )
 
-    handout.current_version = vnum
+    handout.latest_version = vnum
 
     session.add(v)
     session.add(handout)
-    session.commit()
-    session.refresh(v)
+    session.flush()
 
     return v
+
+@metrics.timed("version.add_upload")
+def add_upload(session: Session, subject, title, file_path, mime, size, checksum, user_email,
+               filename=None):
+    """Same-title detection + version bump shared by every upload path.
+
+    Returns (handout, version, created) where created is True for a brand
+    new handout. Must run inside deps.write_session().
+    """
+    handout, created = handout_service.get_or_create(session, title, user_email, subject)
+    handout_service.touch_subject(session, subject, new_handout=created)
+    v = create_version(session, handout, file_path, mime, size, checksum, user_email,
+                       filename=filename)
+    # heavy post-processing is queued in the same transaction
+    job_queue.enqueue(session, v.id, checksum)
+    return handout, v, created
+
+@metrics.timed("version.add_blob_upload")
+def add_blob_upload(session: Session, subject, title, filename, tmp_path, checksum, size, mime,
+                    user_email):
+    """add_upload() for content-addressed files.
+
+    tmp_path is adopted into the blob store (or dropped if the bytes are
+    already known); pass tmp_path=None to reference an existing blob.
+    """
+    if tmp_path:
+        b = blob_service.store(session, tmp_path, checksum, size, mime)
+    else:
+        b = blob_service.add_ref(session, checksum)
+    return add_upload(session, subject, title, b.path, b.mime, b.size, checksum, user_email,
+                      filename=filename)
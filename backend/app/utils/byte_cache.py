@@ -0,0 +1,48 @@
+# backend/app/utils/byte_cache.py
+import threading
+from collections import OrderedDict
+
+
+class ByteCache:
+    """LRU bounded by the total size of its values (bytes by default).
+
+    Entries larger than an eighth of the budget are not kept, so one
+    big value can never flush everything else out.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size: int = None):
+        # size: what value counts against the budget, if not len(value)
+        size = len(value) if size is None else size
+        if size > self.max_bytes // 8:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._data[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,44 @@
+# backend/app/utils/file_lock.py
+"""An exclusive lock shared by the threads and worker processes of one host."""
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: single-process deployments only
+    fcntl = None
+
+
+class FileLock:
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd = None
+
+    def acquire(self):
+        # flock() belongs to the open file, which all threads share, so
+        # threads queue on the thread lock first
+        self._thread_lock.acquire()
+        try:
+            if fcntl is not None:
+                if self._fd is None:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def release(self):
+        try:
+            if fcntl is not None and self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,130 @@
+# backend/app/utils/file_response.py
+import os
+from urllib.parse import quote
+from fastapi import Request
+from fastapi.responses import Response, FileResponse, StreamingResponse
+from app.config import get_settings
+
+settings = get_settings()
+
+CHUNK_SIZE = 256 * 1024
+
+def make_etag(checksum: str = None, st: os.stat_result = None):
+    # the sha256 identifies the bytes exactly, so the tag can be strong
+    if checksum:
+        return f'"{checksum}"'
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+def etag_matches(header: str, etag: str):
+    # If-None-Match uses weak comparison, so ignore any W/ prefix
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return etag in tags
+
+def parse_range(header: str, size: int):
+    """Return (start, end) inclusive for a single satisfiable byte range.
+
+    None means "serve the whole file" (no/unsupported/multi range);
+    raises ValueError when the range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if first == "":
+            # suffix range: last N bytes
+            n = int(last)
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if first == "":
+        if n <= 0:
+            raise ValueError("unsatisfiable range")
+        return max(size - n, 0), size - 1
+    if start >= size or end < start:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
+
+class WholeFileResponse(FileResponse):
+    # Starlette's FileResponse parses Range itself (400 for what we
+    # ignore, multipart for several ranges); send_file has already
+    # decided on the whole file, so it must not see the header
+    async def __call__(self, scope, receive, send):
+        scope = {**scope, "headers": [(k, v) for k, v in scope["headers"] if k != b"range"]}
+        await super().__call__(scope, receive, send)
+
+def content_disposition(kind: str, filename: str):
+    if not filename:
+        return kind
+    ascii_name = filename.encode("ascii", "ignore").decode() or "download"
+    return f'{kind}; filename="{ascii_name}"; filename*=UTF-8\'\'{quote(filename)}'
+
+def iter_range(path: str, start: int, length: int):
+    # pread keeps this independent of the file position, no seek races
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        while length > 0:
+            chunk = os.pread(fd, min(CHUNK_SIZE, length), start)
+            if not chunk:
+                break
+            start += len(chunk)
+            length -= len(chunk)
+            yield chunk
+    finally:
+        os.close(fd)
+
+def send_file(request: Request, path: str, media_type: str = None, checksum: str = None,
+              filename: str = None, inline: bool = False):
+    """Serve a stored file with ETag / If-None-Match and single Range support.
+
+    Full responses go out through FileResponse, which servers that
+    implement the ASGI pathsend extension send zero-copy. With
+    ACCEL_REDIRECT_PREFIX set, the body is left to the fronting nginx
+    (X-Accel-Redirect, sendfile(2)) and the app only sends headers.
+    """
+    st = os.stat(path)
+    etag = make_etag(checksum, st)
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": content_disposition("inline" if inline else "attachment", filename),
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    rng = None
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range == etag:
+        try:
+            rng = parse_range(request.headers.get("range"), st.st_size)
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{st.st_size}"})
+
+    rel = os.path.relpath(path, settings.STORAGE_PATH)
+    if settings.ACCEL_REDIRECT_PREFIX and not rel.startswith(".."):
+        headers["X-Accel-Redirect"] = f"{settings.ACCEL_REDIRECT_PREFIX.rstrip('/')}/{quote(rel)}"
+        return Response(media_type=media_type, headers=headers)
+
+    if rng is None:
+        return WholeFileResponse(path, media_type=media_type, headers=headers, stat_result=st)
+
+    start, end = rng
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        iter_range(path, start, length),
+        status_code=206, media_type=media_type, headers=headers,
+    )
+
+def is_first_fetch(request: Request):
+    """True unless this is a follow-up Range request (PDF viewers send many)."""
+    rng = request.headers.get("range", "")
+    return not rng or rng.replace(" ", "").startswith("bytes=0-")
@@ -1,31 +1,155 @@
 # backend/app/utils/file_utils.py
-import os, hashlib, aiofiles, mimetypes
-from app.config import Settings
+import os, uuid, hashlib, aiofiles
+from fastapi import HTTPException
+from app.config import get_settings
+from app.utils import metrics
 
-settings = Settings()
+settings = get_settings()
 
-ALLOWED_TYPES = ["application/pdf", 
-                 "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                 "application/vnd.openxmlformats-officedocument.presentationml.presentation"]
+PDF = "application/pdf"
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PPTX = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
 
-async def save_file(uid, hid, version, file):
-    mime_type = file.content_type
-    if mime_type not in ALLOWED_TYPES:
-        raise Exception("Unsupported file type")
+ALLOWED_TYPES = [PDF, DOCX, PPTX]
+
+def sniff_mime(head: bytes, declared: str = None):
+    """Guess the real type from the first chunk instead of trusting the client."""
+    if head.startswith(b"%PDF-"):
+        return PDF
+    if head.startswith(b"PK\x03\x04"):
+        # OOXML is a zip; the part names give away which flavour it is
+        if b"word/" in head:
+            return DOCX
+        if b"ppt/" in head:
+            return PPTX
+        if declared in (DOCX, PPTX):
+            return declared
+    return None
+
+async def save_file(file, folder=None, max_size=None):
+    """Stream an UploadFile to disk in fixed-size chunks.
+
+    Size, SHA-256 and MIME sniffing happen in the same pass; the upload is
+    aborted with 413 as soon as it grows past max_size. Data is written to
+    a .part file and only renamed into place once complete, so a failed
+    upload never leaves a half-written file behind under its final name.
+    Returns (path, sha256, size, mime).
+    """
+    folder = folder or os.path.join(settings.STORAGE_PATH, "tmp")
+    max_size = max_size or settings.MAX_UPLOAD_SIZE
+    os.makedirs(folder, exist_ok=True)
+
+    ext = os.path.splitext(file.filename or "")[1].lower()
+    full_path = os.path.join(folder, f"{uuid.uuid4().hex}{ext}")
+    tmp_path = full_path + ".part"
 
     size = 0
     sha = hashlib.sha256()
+    mime_type = None
+
+    with metrics.timed("storage.save_file"):
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                    if mime_type is None:
+                        mime_type = sniff_mime(chunk, file.content_type)
+                        if mime_type not in ALLOWED_TYPES:
+                            raise HTTPException(415, "Unsupported file type")
+
+                    size += len(chunk)
+                    if size > max_size:
+                        raise HTTPException(413, "File too large")
+
+                    sha.update(chunk)
+                    await f.write(chunk)
+
+            if size == 0:
+                raise HTTPException(400, "Empty file")
 
-    folder = f"{settings.STORAGE_PATH}/{uid}/{hid}/v{version}/"
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    return full_path, sha.hexdigest(), size, mime_type
+
+@metrics.timed("storage.save_stream")
+def save_stream(src, filename, declared=None, folder=None, max_size=None):
+    """Blocking save_file() for a plain file object, e.g. a ZIP member."""
+    folder = folder or os.path.join(settings.STORAGE_PATH, "tmp")
+    max_size = max_size or settings.MAX_UPLOAD_SIZE
     os.makedirs(folder, exist_ok=True)
-    full_path = f"{folder}{file.filename}"
 
-    async with aiofiles.open(full_path, "wb") as f:
-        while chunk := await file.read(1024 * 1024):
-            size += len(chunk)
-            sha.update(chunk)
-            await f.write(chunk)
+    ext = os.path.splitext(filename or "")[1].lower()
+    full_path = os.path.join(folder, f"{uuid.uuid4().hex}{ext}")
+    tmp_path = full_path + ".part"
 
-    await file.seek(0)
+    size = 0
+    sha = hashlib.sha256()
+    mime_type = None
+
+    try:
+        with open(tmp_path, "wb") as f:
+            while chunk := src.read(settings.UPLOAD_CHUNK_SIZE):
+                if mime_type is None:
+                    mime_type = sniff_mime(chunk, declared)
+                    if mime_type not in ALLOWED_TYPES:
+                        raise HTTPException(415, "Unsupported file type")
+
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(413, "File too large")
+
+                sha.update(chunk)
+                f.write(chunk)
+
+        if size == 0:
+            raise HTTPException(400, "Empty file")
+
+        os.replace(tmp_path, full_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
     return full_path, sha.hexdigest(), size, mime_type
+
+async def hash_upload(file, max_size=None):
+    """Checksum an upload without writing it anywhere.
+
+    Used when the client claims bytes we already hold: if the digest
+    matches, the upload is linked to the existing blob and never hits
+    the disk. Rewinds the file so it can still be saved on a mismatch.
+    Returns (sha256, size, mime).
+    """
+    max_size = max_size or settings.MAX_UPLOAD_SIZE
+    size = 0
+    sha = hashlib.sha256()
+    mime_type = None
+
+    while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+        if mime_type is None:
+            mime_type = sniff_mime(chunk, file.content_type)
+        size += len(chunk)
+        if size > max_size:
+            raise HTTPException(413, "File too large")
+        sha.update(chunk)
+
+    await file.seek(0)
+    return sha.hexdigest(), size, mime_type
+
+def hash_path(path, declared=None):
+    """Blocking (size, sha256, mime) of a file on disk; run it in a thread."""
+    size = 0
+    sha = hashlib.sha256()
+    mime_type = None
+
+    with open(path, "rb") as f:
+        while chunk := f.read(settings.UPLOAD_CHUNK_SIZE):
+            if mime_type is None:
+                mime_type = sniff_mime(chunk, declared)
+            size += len(chunk)
+            sha.update(chunk)
+
+    return sha.hexdigest(), size, mime_type
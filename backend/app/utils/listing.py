@@ -0,0 +1,92 @@
+# backend/app/utils/listing.py
+"""Shared plumbing for the paginated listing endpoints.
+
+Cursors are opaque to clients: url-safe base64 of the sort key of the
+last row served. Responses carry the next cursor in X-Next-Cursor and,
+where the caller can supply one, a weak ETag / Last-Modified pair so
+clients can revalidate with a 304.
+"""
+import json
+import base64
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from app.utils.file_response import etag_matches
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def invalid_cursor():
+    return HTTPException(400, "Invalid cursor")
+
+def decode_cursor(cursor: str, sort: str):
+    """Return the row key stored in cursor, or None for the first page.
+
+    Only the shape is checked here; handout_service.keyset() checks the
+    key against the sort's columns.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise invalid_cursor()
+    if cursor_sort != sort:
+        raise HTTPException(400, "Cursor belongs to a different sort order")
+    # clients can send anything; a key is a list of plain values
+    if not isinstance(key, list) or not all(isinstance(v, (str, int, float)) for v in key):
+        raise invalid_cursor()
+    return key
+
+def project(items, fields: str = None):
+    """Keep only the comma separated fields the client asked for."""
+    if not fields:
+        return items
+    keep = [f.strip() for f in fields.split(",") if f.strip()]
+    return [{k: item[k] for k in keep if k in item} for item in items]
+
+def weak_etag(*parts):
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:24]
+    return f'W/"{digest}"'
+
+def http_date(dt: datetime):
+    # stored timestamps are naive UTC
+    return format_datetime(dt.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+def not_modified(request: Request, etag: str, last_modified: datetime = None):
+    inm = request.headers.get("if-none-match")
+    if inm:
+        return etag_matches(inm, etag.removeprefix("W/"))
+    ims = request.headers.get("if-modified-since")
+    if ims and last_modified:
+        try:
+            since = parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+def validators(etag: str = None, last_modified: datetime = None):
+    headers = {"Cache-Control": "private, no-cache"}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+def not_modified_response(etag: str = None, last_modified: datetime = None):
+    return Response(status_code=304, headers=validators(etag, last_modified))
+
+def page_response(items, next_key, sort: str, fields: str = None,
+                  etag: str = None, last_modified: datetime = None):
+    headers = validators(etag, last_modified)
+    if next_key is not None:
+        headers["X-Next-Cursor"] = encode_cursor([sort, next_key])
+    return JSONResponse(project(items, fields), headers=headers)
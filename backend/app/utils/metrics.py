@@ -0,0 +1,289 @@
+# backend/app/utils/metrics.py
+"""Prometheus metrics and opt-in per-request profiling, no dependencies.
+
+Metrics are plain in-process counters rendered as Prometheus text by
+render(). timed() feeds the per-operation histogram and, only when the
+current request asked for a profile, appends a span to its trace; with
+profiling off it costs two perf_counter() calls and one locked add.
+"""
+import os
+import time
+import uuid
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+# ============================================================
+# METRIC TYPES
+# ============================================================
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self.labels, k, v) for k, v in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, names, values, v in self.samples():
+            lines.append(f"{name}{_labels(names, values)} {v}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """A settable value, or one read from fn() at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels=(), fn=None):
+        super().__init__(name, help, labels)
+        self._fn = fn
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def samples(self):
+        if self._fn is not None:
+            return [(self.name, (), (), self._fn())]
+        return super().samples()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            h = self._values.get(labels)
+            if h is None:
+                # per-bucket counts (+Inf last), sum
+                h = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            h[0][i] += 1
+            h[1] += value
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(k, list(counts), total) for k, (counts, total) in self._values.items()]
+        out = []
+        names = self.labels + ("le",)
+        for values, counts, total in snapshot:
+            running = 0
+            for le, n in zip(self.buckets + ("+Inf",), counts):
+                running += n
+                out.append((f"{self.name}_bucket", names, values + (le,), running))
+            out.append((f"{self.name}_sum", self.labels, values, total))
+            out.append((f"{self.name}_count", self.labels, values, running))
+        return out
+
+
+def render():
+    lines = []
+    for m in _registry:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+# ============================================================
+# APP METRICS
+# ============================================================
+REQUESTS = Counter("http_requests_total", "HTTP requests served", ("method", "route", "status"))
+LATENCY = Histogram("http_request_duration_seconds", "Time to the end of the response body",
+                    ("method", "route"))
+BYTES_IN = Counter("http_request_bytes_total", "Request body bytes received", ("route",))
+BYTES_OUT = Counter("http_response_bytes_total", "Response body bytes sent", ("route",))
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served")
+OPERATIONS = Histogram("handout_vault_operation_seconds", "Time spent in internal operations",
+                       ("op",))
+GROUP_COMMIT_SIZE = Histogram("handout_vault_group_commit_size", "Writes committed per transaction",
+                              buckets=(1, 2, 4, 8, 16, 32, 64))
+
+# ============================================================
+# PROFILING
+# ============================================================
+class Trace:
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.start = time.perf_counter()
+        self.spans = []
+        self.depth = 0
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "spans": [
+                {"op": op, "depth": depth, "start_ms": round(start * 1000, 3), "ms": round(dur * 1000, 3)}
+                for op, depth, start, dur in sorted(self.spans, key=lambda s: s[2])
+            ],
+        }
+
+    def server_timing(self):
+        # one entry per operation, summed: keeps the header short
+        totals = {}
+        for op, _, _, dur in self.spans:
+            totals[op] = totals.get(op, 0.0) + dur
+        return ", ".join(f'{op.replace(".", "-")};dur={d * 1000:.2f}' for op, d in totals.items())
+
+
+_trace = ContextVar("trace", default=None)
+recent_traces = deque(maxlen=200)
+
+
+class timed(ContextDecorator):
+    """Time a block or function into OPERATIONS (and the profile, if any).
+
+        with metrics.timed("storage.save_file"): ...
+
+        @metrics.timed("version.add_upload")
+        def add_upload(...): ...
+    """
+    def __init__(self, op: str):
+        self.op = op
+
+    def _recreate_cm(self):
+        # a decorated function may run in several threads at once
+        return timed(self.op)
+
+    def __enter__(self):
+        self._trace = t = _trace.get()
+        if t is not None:
+            t.depth += 1
+            self._depth = t.depth
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        OPERATIONS.observe(end - self._t0, self.op)
+        t = self._trace
+        if t is not None:
+            t.depth -= 1
+            t.spans.append((self.op, self._depth, self._t0 - t.start, end - self._t0))
+        return False
+
+# ============================================================
+# ASGI MIDDLEWARE
+# ============================================================
+class MetricsMiddleware:
+    """Latency, status, body bytes and in-flight count for every request.
+
+    Plain ASGI rather than @app.middleware("http") so streamed bodies
+    are counted as they go and nothing is buffered. Requests carrying
+    X-Profile: 1 get a trace when profiling is enabled: Server-Timing
+    and X-Profile-Id on the response, the full span list under
+    /debug/profile/<id>.
+    """
+    def __init__(self, app, profiling: bool = False, skip=("/metrics",)):
+        self.app = app
+        self.profiling = profiling
+        self.skip = skip
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip:
+            return await self.app(scope, receive, send)
+
+        trace = None
+        if self.profiling and (b"x-profile", b"1") in scope["headers"]:
+            trace = Trace(scope["method"], scope["path"])
+            token = _trace.set(trace)
+
+        status = 500
+        received = sent = 0
+        t0 = time.perf_counter()
+        IN_FLIGHT.inc()
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trace is not None:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-profile-id", trace.id.encode()))
+                    headers.append((b"server-timing", trace.server_timing().encode()))
+                    message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            elif message["type"] == "http.response.pathsend":
+                # the server sends the whole file itself (FileResponse)
+                try:
+                    sent += os.path.getsize(message["path"])
+                except OSError:
+                    pass
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            elapsed = time.perf_counter() - t0
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            # templated path, so /handouts/{handout_id}/versions is one series
+            route = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            REQUESTS.inc(method, route, status)
+            LATENCY.observe(elapsed, method, route)
+            if received:
+                BYTES_IN.inc(route, amount=received)
+            if sent:
+                BYTES_OUT.inc(route, amount=sent)
+            if trace is not None:
+                _trace.reset(token)
+                trace.spans.append(("request", 0, 0.0, elapsed))
+                recent_traces.append(trace)
+
+
+def get_trace(trace_id: str):
+    for t in reversed(recent_traces):
+        if t.id == trace_id:
+            return t.as_dict()
+    return None
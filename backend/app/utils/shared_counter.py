@@ -0,0 +1,49 @@
+# backend/app/utils/shared_counter.py
+"""64-bit counters in a memory-mapped file that every worker process reads and writes."""
+import os
+import mmap
+import struct
+import threading
+
+_SLOT = struct.Struct("<Q")
+
+
+class SharedCounters:
+    def __init__(self, path: str, slots: int):
+        self.path = path
+        self.slots = slots
+        self._map = None
+        self._lock = threading.Lock()
+
+    def _mapped(self):
+        if self._map is None:
+            with self._lock:
+                if self._map is None:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                    try:
+                        size = self.slots * _SLOT.size
+                        # only ever grow: another worker may be reading it
+                        if os.fstat(fd).st_size < size:
+                            os.ftruncate(fd, size)
+                        self._map = mmap.mmap(fd, size)
+                    finally:
+                        os.close(fd)
+        return self._map
+
+    def get(self, slot: int):
+        return _SLOT.unpack_from(self._mapped(), slot * _SLOT.size)[0]
+
+    def set(self, slot: int, value: int):
+        """Writers must be serialised by the caller, as for add()."""
+        _SLOT.pack_into(self._mapped(), slot * _SLOT.size, max(value, 0))
+
+    def add(self, slot: int, n: int):
+        """Add n (may be negative; the counter stops at 0). Returns the new value."""
+        value = max(self.get(slot) + n, 0)
+        self.set(slot, value)
+        return value
+
+    def bump(self, slot: int):
+        """Increment one counter. Writers must be serialised by the caller."""
+        self.add(slot, 1)
@@ -0,0 +1,66 @@
+# backend/app/utils/signed_url.py
+"""Short-lived HMAC signatures for URLs loaded by <img> / <iframe>.
+
+Those elements cannot send an Authorization header, so the page asks
+for a signature once and appends ?expires=&sig= to every media URL of a
+handout. Expiry is rounded up to a whole MEDIA_URL_TTL window: URLs
+stay the same for a while, so the browser cache still works, and every
+signature is valid for between one and two windows.
+"""
+import os
+import hmac
+import time
+import hashlib
+import secrets
+import threading
+from app.config import get_settings
+
+settings = get_settings()
+
+_key = None
+_key_lock = threading.Lock()
+
+def _signing_key():
+    # MEDIA_URL_KEY, or a random key kept next to the data so that every
+    # worker (and a restart) signs with the same one
+    global _key
+    if _key is None:
+        with _key_lock:
+            if _key is None:
+                if settings.MEDIA_URL_KEY:
+                    _key = settings.MEDIA_URL_KEY.encode()
+                else:
+                    _key = _stored_key(os.path.join(settings.STORAGE_PATH, ".media_url_key"))
+    return _key
+
+def _stored_key(path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+    # a worker that lost the race may read before the winner has written
+    for _ in range(50):
+        with open(path) as f:
+            key = f.read().strip()
+        if key:
+            return key.encode()
+        time.sleep(0.01)
+    raise RuntimeError(f"{path} is empty")
+
+def _mac(scope: str, expires: int):
+    return hmac.new(_signing_key(), f"{scope}\n{expires}".encode(), hashlib.sha256).hexdigest()
+
+def sign(scope: str):
+    """Query parameters granting access to scope until they expire."""
+    ttl = settings.MEDIA_URL_TTL
+    expires = (int(time.time()) // ttl + 2) * ttl
+    return {"expires": expires, "sig": _mac(scope, expires)}
+
+def verify(scope: str, expires: int, sig: str):
+    if not expires or not sig or expires < time.time():
+        return False
+    return hmac.compare_digest(_mac(scope, expires), sig)
@@ -0,0 +1,96 @@
+# backend/app/utils/startup_report.py
+"""Where does cold start go?
+
+install() hooks the import system and times every module that gets
+executed (inclusive and self time); timed() measures one-off init steps
+such as creating the engine or loading the embedding model. report()
+returns both, most expensive first. Lazy subsystems keep reporting on
+first use, so their cost shows up even when it is paid after startup.
+"""
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from importlib.abc import MetaPathFinder
+
+_imports = {}
+_inits = {}
+_stack = threading.local()
+_started = time.perf_counter()
+_ready = None
+
+
+class _TimingLoader:
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        stack = _stack.__dict__.setdefault("frames", [])
+        stack.append(0.0)
+        t0 = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - t0
+            children = stack.pop()
+            if stack:
+                stack[-1] += total
+            _imports[module.__name__] = (total, total - children)
+
+
+class _TimingFinder(MetaPathFinder):
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimingLoader(spec.loader)
+                return spec
+        return None
+
+
+_finder = _TimingFinder()
+
+def install():
+    if _finder not in sys.meta_path:
+        sys.meta_path.insert(0, _finder)
+
+def uninstall():
+    if _finder in sys.meta_path:
+        sys.meta_path.remove(_finder)
+
+def mark_ready():
+    global _ready
+    _ready = time.perf_counter() - _started
+
+@contextmanager
+def timed(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _inits[name] = _inits.get(name, 0.0) + time.perf_counter() - t0
+
+def report(top: int = 30):
+    ms = lambda s: round(s * 1000, 2)
+    imports = sorted(_imports.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+    return {
+        "ready_ms": ms(_ready) if _ready is not None else None,
+        "modules_imported": len(_imports),
+        "imports": [
+            {"module": name, "total_ms": ms(total), "self_ms": ms(own)}
+            for name, (total, own) in imports
+        ],
+        "init": [
+            {"step": name, "ms": ms(t)}
+            for name, t in sorted(_inits.items(), key=lambda kv: kv[1], reverse=True)
+        ],
+    }
@@ -0,0 +1,58 @@
+# backend/app/utils/token_cache.py
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class TokenCache:
+    """LRU of verified token claims, each entry valid until the token's exp.
+
+    Keys are SHA-256 digests, so raw bearer tokens are never kept in
+    memory longer than the request that carried them.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str):
+        k = self.key(token)
+        with self._lock:
+            entry = self._data.get(k)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, exp = entry
+            if exp <= time.time():
+                del self._data[k]
+                self.misses += 1
+                return None
+            self._data.move_to_end(k)
+            self.hits += 1
+            return claims
+
+    def put(self, token: str, claims: dict):
+        exp = claims.get("exp")
+        if not exp or exp <= time.time():
+            return
+        k = self.key(token)
+        with self._lock:
+            self._data[k] = (claims, exp)
+            self._data.move_to_end(k)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
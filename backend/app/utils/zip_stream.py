@@ -0,0 +1,56 @@
+# backend/app/utils/zip_stream.py
+"""Build a ZIP archive while it is being sent.
+
+zipfile writes into a sink that is drained after every chunk, so memory
+use is one read buffer no matter how large the archive gets and nothing
+touches the disk. The sink is not seekable, so zipfile falls back to
+data descriptors after each member instead of patching local headers.
+"""
+import io
+import os
+import zipfile
+from datetime import datetime
+
+CHUNK_SIZE = 256 * 1024
+
+
+class _Sink(io.RawIOBase):
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self):
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def stream_zip(entries):
+    """Yield the bytes of a ZIP made from (arcname, path, mtime) entries.
+
+    Members are stored uncompressed: PDF and OOXML are compressed
+    already, and deflating them again costs CPU for almost no gain.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for arcname, path, mtime in entries:
+            info = zipfile.ZipInfo(arcname, date_time=(mtime or datetime.utcnow()).timetuple()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = os.path.getsize(path)
+            with open(path, "rb") as src, zf.open(info, "w", force_zip64=True) as dst:
+                while chunk := src.read(CHUNK_SIZE):
+                    dst.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
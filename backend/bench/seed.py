@@ -0,0 +1,228 @@
+# backend/bench/seed.py
+"""Synthetic subjects / handouts / versions for the benchmarks.
+
+Rows are bulk-inserted straight into the tables (or written as one
+handout_data.json for the legacy backend), so even 1M versions seed in
+minutes instead of going through a million uploads. File contents come
+from a small pool of distinct PDFs shared through the blob store, which
+is what real re-uploads of unchanged files look like anyway.
+
+Must run with the working directory set to the bench workdir and
+STORAGE_PATH pointing inside it; bench/run.py arranges both.
+"""
+import os
+import json
+import random
+import hashlib
+from datetime import datetime, timedelta
+
+BATCH = 10_000
+# ids handed to the load generator; requests pick from these at random
+SAMPLE = 10_000
+
+WORDS = (
+    "algebra calculus vectors matrices proofs induction graphs trees sorting hashing "
+    "thermodynamics entropy kinetics optics waves circuits transistors signals "
+    "genetics cells enzymes ecology evolution markets demand supply inflation "
+    "contracts torts ethics syntax semantics compilers networks databases"
+).split()
+
+
+def fake_pdf(rng: random.Random, size: int):
+    """A valid one-page PDF of about `size` bytes, so ingestion can read it."""
+    text = " ".join(rng.choice(WORDS) for _ in range(max(size // 7, 4)))[: max(size - 450, 32)]
+    stream = f"BT /F1 10 Tf 40 800 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def plan(versions: int, subjects: int, per_handout: int, rng: random.Random):
+    """[(subject, title, n_versions)] adding up to `versions`."""
+    out, left, i = [], versions, 0
+    while left > 0:
+        n = min(left, rng.randint(1, per_handout * 2 - 1))
+        out.append((f"Subject {i % subjects:04d}", f"Handout {i:07d}", n))
+        left -= n
+        i += 1
+    return out
+
+
+def write_files(folder: str, count: int, size: int, rng: random.Random):
+    """[(path, sha256, size)] for `count` distinct synthetic PDFs."""
+    os.makedirs(folder, exist_ok=True)
+    files = []
+    for i in range(count):
+        data = fake_pdf(rng, size)
+        sha = hashlib.sha256(data).hexdigest()
+        path = os.path.join(folder, sha)
+        with open(path, "wb") as f:
+            f.write(data)
+        files.append((path, sha, len(data)))
+    return files
+
+
+# ============================================================
+# SQLITE BACKEND (app.models)
+# ============================================================
+def index_sample(sample, pool, docs: int):
+    """Put `docs` seeded versions into the search index (needs the model)."""
+    from app.services import search_service
+    from app.utils.file_utils import PDF
+
+    encoded = {}
+    pairs = list(zip(sample["handouts"], sample["versions"]))[:docs]
+    for i, ((hid, subject, title), (_, vid)) in enumerate(pairs):
+        path = pool[i % len(pool)][0]
+        if path not in encoded:
+            chunks = search_service.chunk_text(search_service.extract_text(path, PDF))
+            encoded[path] = chunks, search_service.embed([c["text"] for c in chunks])
+        chunks, vectors = encoded[path]
+        payload = {"version_id": vid, "handout_id": hid, "version": int(vid.rsplit("_v", 1)[1]),
+                   "subject": subject, "title": title}
+        search_service.index_chunks(payload, chunks, vectors)
+    search_service.close()
+
+
+def seed_sqlite(versions: int, subjects: int, per_handout: int, files: int, file_size: int, seed: int,
+                search_docs: int = 0):
+    from sqlalchemy import insert
+    from app.deps import init_db, get_engine
+    from app.models.handout import Handout
+    from app.models.version import HandoutVersion
+    from app.models.subject import Subject
+    from app.models.blob import Blob
+    from app.services import blob_service
+    from app.utils.file_utils import PDF
+
+    rng = random.Random(seed)
+    init_db()
+
+    pool = []
+    for path, sha, size in write_files(os.path.join("seed_files"), files, file_size, rng):
+        dest = blob_service.blob_path(sha)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(path, dest)
+        pool.append((dest, sha, size))
+
+    now = datetime.utcnow()
+    handouts, rows, counts, refs = [], [], {}, {}
+    sample = {"subjects": [], "handouts": [], "versions": []}
+
+    with get_engine().begin() as conn:
+        def flush():
+            if handouts:
+                conn.execute(insert(Handout), handouts)
+            if rows:
+                conn.execute(insert(HandoutVersion), rows)
+            handouts.clear()
+            rows.clear()
+
+        for i, (subject, title, n) in enumerate(plan(versions, subjects, per_handout, rng)):
+            hid = hashlib.md5(title.encode()).hexdigest()
+            created = now - timedelta(minutes=versions - i)
+            handouts.append({
+                "id": hid, "subject": subject, "title": title, "title_key": title.lower(),
+                "owner_id": "bench", "created_at": created, "latest_version": n,
+            })
+            counts[subject] = counts.get(subject, 0) + 1
+            for v in range(1, n + 1):
+                path, sha, size = pool[rng.randrange(len(pool))]
+                refs[sha] = refs.get(sha, 0) + 1
+                rows.append({
+                    "id": f"{hid}_v{v}", "handout_id": hid, "version": v,
+                    "filename": f"{title}.pdf", "file_path": path, "file_type": PDF,
+                    "file_size": size, "checksum": sha, "summary": "Uploaded by bench",
+                    "uploaded_by": "bench", "downloads": 0, "previews": 0,
+                    "created_at": created + timedelta(seconds=v),
+                })
+            if len(sample["handouts"]) < SAMPLE:
+                sample["handouts"].append([hid, subject, title])
+                sample["versions"].append([hid, f"{hid}_v{n}"])
+            if len(rows) >= BATCH:
+                flush()
+        flush()
+
+        conn.execute(insert(Subject), [
+            {"name": s, "handout_count": c, "generation": c, "updated_at": now}
+            for s, c in counts.items()
+        ])
+        conn.execute(insert(Blob), [
+            {"checksum": sha, "size": size, "mime": PDF, "path": path,
+             "refcount": refs.get(sha, 0), "created_at": now, "encoding": "raw"}
+            for path, sha, size in pool
+        ])
+
+    sample["subjects"] = sorted(counts)
+    if search_docs:
+        index_sample(sample, pool, search_docs)
+    return sample
+
+
+# ============================================================
+# LEGACY JSON BACKEND (bench/legacy_app.py)
+# ============================================================
+def seed_legacy(versions: int, subjects: int, per_handout: int, files: int, file_size: int, seed: int,
+                search_docs: int = 0):
+    rng = random.Random(seed)
+    pool = write_files("uploads", files, file_size, rng)
+
+    data = {"subjects": {}, "handouts": {}, "versions": {}}
+    sample = {"subjects": [], "handouts": [], "versions": []}
+    for subject, title, n in plan(versions, subjects, per_handout, rng):
+        hid = hashlib.md5(title.encode()).hexdigest()
+        data["subjects"].setdefault(subject, []).append(hid)
+        data["handouts"][hid] = {"id": hid, "title": title, "subject": subject, "latest_version": n}
+        for v in range(1, n + 1):
+            vid = f"{hid}_v{v}"
+            data["versions"][vid] = {
+                "version_id": vid, "handout_id": hid, "version": v,
+                "file_path": pool[rng.randrange(len(pool))][0],
+            }
+        if len(sample["handouts"]) < SAMPLE:
+            sample["handouts"].append([hid, subject, title])
+            sample["versions"].append([hid, f"{hid}_v{n}"])
+
+    with open("handout_data.json", "w") as f:
+        json.dump(data, f, indent=2)
+
+    sample["subjects"] = sorted(data["subjects"])
+    return sample
+
+
+SEEDERS = {"sqlite": seed_sqlite, "legacy": seed_legacy}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Seed a bench workdir (run from inside it).")
+    p.add_argument("backend", choices=sorted(SEEDERS))
+    p.add_argument("--versions", type=int, default=10_000)
+    p.add_argument("--subjects", type=int, default=50)
+    p.add_argument("--per-handout", type=int, default=4, help="average versions per handout")
+    p.add_argument("--files", type=int, default=32, help="distinct file contents")
+    p.add_argument("--file-size", type=int, default=256 * 1024)
+    p.add_argument("--search-docs", type=int, default=0)
+    p.add_argument("--seed", type=int, default=1)
+    a = p.parse_args()
+
+    sample = SEEDERS[a.backend](a.versions, a.subjects, a.per_handout, a.files, a.file_size, a.seed,
+                                a.search_docs)
+    with open("seed.json", "w") as f:
+        json.dump(sample, f)
@@ -0,0 +1,14 @@
+# backend/tests/conftest.py
+# Run from backend/:  python -m pytest
+#
+# The app keeps its database and storage under the working directory, so
+# every test run gets a scratch one before anything from app is imported.
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp(prefix="handout-vault-tests-"))
+os.environ.setdefault("INGEST_WORKERS", "0")
+# wide enough that writers queued together always share one batch
+os.environ.setdefault("GROUP_COMMIT_WINDOW", "0.2")
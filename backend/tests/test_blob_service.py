@@ -0,0 +1,61 @@
+# backend/tests/test_blob_service.py
+import os
+import zlib
+import hashlib
+import pytest
+from app import deps
+from app.models.blob import Blob
+from app.services import blob_service
+
+
+def _zlib_blob(data: bytes):
+    checksum = hashlib.sha256(data).hexdigest()
+    path = blob_service.blob_path(checksum)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.zlib", "wb") as f:
+        f.write(zlib.compress(data))
+    with deps.write_session() as s:
+        s.add(Blob(checksum=checksum, size=len(data), path=path, encoding="zlib", refcount=1))
+    return checksum
+
+
+def test_a_damaged_materialized_copy_is_rebuilt():
+    deps.init_db()
+    data = b"older version " * 1000
+    checksum = _zlib_blob(data)
+
+    with deps.read_session() as s:
+        path = blob_service.materialize(s, s.get(Blob, checksum))
+    with open(path, "r+b") as f:
+        f.truncate(100)
+
+    with deps.read_session() as s:
+        assert blob_service.materialize(s, s.get(Blob, checksum)) == path
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+
+@pytest.mark.skipif(blob_service._bsdiff4() is None, reason="bsdiff4 not installed")
+def test_no_delta_above_the_size_cap(monkeypatch, tmp_path):
+    deps.init_db()
+    base = os.urandom(64 * 1024)
+    newer = base + b"one more page"
+    checksums = []
+    for data in (newer, base):
+        path = tmp_path / "upload"
+        path.write_bytes(data)
+        checksum = hashlib.sha256(data).hexdigest()
+        with deps.write_session() as s:
+            blob_service.store(s, str(path), checksum, len(data), None)
+        checksums.append(checksum)
+    newer_sum, old_sum = checksums
+    state = {newer_sum: ("raw", None), old_sum: ("raw", None)}
+    staging = str(tmp_path)
+
+    monkeypatch.setattr(blob_service.settings, "DELTA_MAX_SIZE", 32 * 1024)
+    # random bytes do not compress: without a delta nothing is saved
+    assert blob_service._rebalance_one(old_sum, "raw", newer_sum, 0.1, False, state, staging) is None
+
+    monkeypatch.setattr(blob_service.settings, "DELTA_MAX_SIZE", 1024 * 1024)
+    assert blob_service._rebalance_one(old_sum, "raw", newer_sum, 0.1, False, state, staging)[0] == "encoded"
+    assert state[old_sum] == ("bsdiff", newer_sum)
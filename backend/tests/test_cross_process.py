@@ -0,0 +1,35 @@
+# backend/tests/test_cross_process.py
+import os
+import multiprocessing
+from app.utils.file_lock import FileLock
+from app.utils.shared_counter import SharedCounters
+
+WORKERS = 4
+ROUNDS = 10000
+
+
+def bump_many(path, start):
+    # read-modify-write races unless the lock really holds across processes
+    lock = FileLock(path + ".lock")
+    counters = SharedCounters(path, 2)
+    start.wait()  # spawned workers come up one by one; race for real
+    for _ in range(ROUNDS):
+        with lock:
+            counters.bump(1)
+
+
+def test_lock_and_counters_across_processes(tmp_path):
+    path = str(tmp_path / "counters")
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Barrier(WORKERS)
+    workers = [ctx.Process(target=bump_many, args=(path, start)) for _ in range(WORKERS)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(60)
+        assert w.exitcode == 0
+
+    counters = SharedCounters(path, 2)
+    assert counters.get(1) == WORKERS * ROUNDS
+    assert counters.get(0) == 0
+    assert os.path.getsize(path) == 16
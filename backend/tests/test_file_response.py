@@ -0,0 +1,62 @@
+# backend/tests/test_file_response.py
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.utils import file_response
+
+DATA = bytes(range(256)) * 40
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    path = tmp_path_factory.mktemp("files") / "f.bin"
+    path.write_bytes(DATA)
+    app = FastAPI()
+
+    @app.get("/f")
+    def f(request: Request):
+        return file_response.send_file(request, str(path), checksum="abc")
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("bytes=0-9", DATA[:10]),
+    ("bytes=100-", DATA[100:]),
+    ("bytes=-10", DATA[-10:]),
+    ("bytes=10000-99999", DATA[10000:]),
+])
+def test_range(client, header, expected):
+    r = client.get("/f", headers={"Range": header})
+    assert r.status_code == 206
+    assert r.content == expected
+    assert r.headers["content-range"].endswith(f"/{len(DATA)}")
+
+
+@pytest.mark.parametrize("header", ["bytes=-0", f"bytes={len(DATA)}-", "bytes=9-5"])
+def test_unsatisfiable_range(client, header):
+    r = client.get("/f", headers={"Range": header})
+    assert r.status_code == 416
+    assert r.headers["content-range"] == f"bytes */{len(DATA)}"
+
+
+@pytest.mark.parametrize("header", ["bytes=a-b", "bytes=0-9,20-29", "items=0-9"])
+def test_unsupported_range_gets_the_whole_file(client, header):
+    r = client.get("/f", headers={"Range": header})
+    assert (r.status_code, r.content) == (200, DATA)
+
+
+def test_etag_revalidation(client):
+    r = client.get("/f")
+    assert r.headers["etag"] == '"abc"'
+    assert client.get("/f", headers={"If-None-Match": 'W/"abc"'}).status_code == 304
+    assert client.get("/f", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_if_range(client):
+    # the copy the client holds is current: the range applies
+    r = client.get("/f", headers={"Range": "bytes=0-9", "If-Range": '"abc"'})
+    assert (r.status_code, r.content) == (206, DATA[:10])
+    # it changed since: send the whole new file instead
+    r = client.get("/f", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert (r.status_code, r.content) == (200, DATA)
@@ -0,0 +1,67 @@
+# backend/tests/test_firebase_tokens.py
+import time
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from app import firebase
+
+PROJECT = "handout-vault-test"
+
+
+@pytest.fixture
+def keypair(monkeypatch):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    firebase.set_keys({"test-kid": key.public_key()})
+    firebase.token_cache.clear()
+    monkeypatch.setattr(firebase, "project_id", lambda: PROJECT)
+
+    # count instead of calling Google; a "fetch" returns the same keys
+    fetches = []
+    def fetch_keys():
+        fetches.append(time.time())
+        firebase._last_fetch = time.time()
+        firebase.set_keys({"test-kid": key.public_key()})
+    monkeypatch.setattr(firebase, "fetch_keys", fetch_keys)
+    monkeypatch.setattr(firebase, "_last_fetch", 0.0)
+    return key, fetches
+
+
+def make_token(key, kid="test-kid", audience=PROJECT, expires_in=3600, sub="user-1"):
+    now = int(time.time())
+    claims = {
+        "iss": f"https://securetoken.google.com/{audience}", "aud": audience,
+        "sub": sub, "iat": now - 10, "exp": now + expires_in,
+    }
+    return jwt.encode(claims, key, algorithm="RS256", headers={"kid": kid})
+
+
+def test_valid_token(keypair):
+    key, fetches = keypair
+    claims = firebase.verify_token(make_token(key))
+    assert claims["uid"] == "user-1"
+    assert not fetches
+
+
+def test_expired_token(keypair):
+    key, _ = keypair
+    with pytest.raises(jwt.ExpiredSignatureError):
+        firebase.verify_token(make_token(key, expires_in=-firebase.CLOCK_SKEW - 60))
+
+
+def test_wrong_audience(keypair):
+    key, _ = keypair
+    with pytest.raises(jwt.InvalidTokenError):
+        firebase.verify_token(make_token(key, audience="someone-else"))
+
+
+def test_unknown_kid_fetches_at_most_once_per_interval(keypair):
+    key, fetches = keypair
+    for i in range(5):
+        with pytest.raises(jwt.InvalidTokenError):
+            firebase.verify_token(make_token(key, kid=f"forged-{i}"))
+    assert len(fetches) == 1
+
+    # the same forged kid again is answered from the negative cache
+    with pytest.raises(jwt.InvalidTokenError):
+        firebase.verify_token(make_token(key, kid="forged-0", sub="other"))
+    assert len(fetches) == 1
@@ -0,0 +1,49 @@
+# backend/tests/test_group_commit.py
+import sqlite3
+from concurrent.futures import Future
+from app import deps
+from app.models.subject import Subject
+
+
+def _visible(name):
+    # a separate connection sees only committed rows
+    with sqlite3.connect(deps.DB_PATH) as conn:
+        return conn.execute("SELECT count(*) FROM subject WHERE name = ?", (name,)).fetchone()[0]
+
+
+def test_batch_is_one_transaction():
+    deps.init_db()
+    seen = {}
+
+    def add(name):
+        def write(s):
+            s.add(Subject(name=name))
+            s.flush()
+            return name
+        return write
+
+    def fail(s):
+        s.add(Subject(name="rolled-back"))
+        s.flush()
+        raise ValueError("bad writer")
+
+    def look(s):
+        # runs after "first" in the same batch, before the outer commit
+        seen["first"] = _visible("first")
+        return None
+
+    futures = []
+    for fn in (add("first"), fail, look, add("second")):
+        fut = Future()
+        deps._commits.put((fn, fut))
+        futures.append(fut)
+    deps.grouped_write(lambda s: None)
+
+    assert futures[0].result() == "first"
+    assert isinstance(futures[1].exception(), ValueError)
+    assert futures[3].result() == "second"
+
+    assert seen["first"] == 0
+    assert _visible("first") == 1
+    assert _visible("second") == 1
+    assert _visible("rolled-back") == 0
@@ -0,0 +1,55 @@
+# backend/tests/test_ingest_worker.py
+import os
+import asyncio
+from app import deps
+from app.models.job import IngestJob
+from app.services import ingest_worker
+
+
+def crash(path, mime, out_dir):
+    os._exit(1)  # what an OOM kill looks like from the parent
+
+
+def succeed(path, mime, out_dir):
+    return out_dir
+
+
+def _job(kind):
+    # as job_queue.claim() leaves it, without picking up other tests' jobs
+    with deps.write_session() as s:
+        j = IngestJob(version_id=f"v-{kind}", checksum="", kind=kind, status="running", attempts=1)
+        s.add(j)
+        s.flush()
+        return j.id
+
+
+def _get(job_id):
+    with deps.read_session() as s:
+        return s.get(IngestJob, job_id)
+
+
+def test_broken_pool_is_replaced_and_the_attempt_not_counted(monkeypatch, tmp_path):
+    deps.init_db()
+    finished = []
+    monkeypatch.setattr(ingest_worker, "_source", lambda vid: ("", "application/pdf"))
+    monkeypatch.setitem(ingest_worker.HANDLERS, "crash", (crash, lambda *a: None, lambda k: str(tmp_path)))
+    monkeypatch.setitem(ingest_worker.HANDLERS, "ok", (succeed, lambda vid, d: finished.append(vid),
+                                                       lambda k: str(tmp_path)))
+    monkeypatch.setattr(ingest_worker.settings, "INGEST_WORKERS", 1)
+    ingest_worker._pool = broken = ingest_worker._new_pool()
+    try:
+        crashed = _job("crash")
+        asyncio.run(ingest_worker.run_job(crashed, "v-crash", "", "crash"))
+
+        j = _get(crashed)
+        assert (j.status, j.attempts, j.error) == ("pending", 0, None)
+        assert ingest_worker._pool is not broken
+
+        # the new pool takes work
+        ok = _job("ok")
+        asyncio.run(ingest_worker.run_job(ok, "v-ok", "", "ok"))
+        assert _get(ok).status == "done"
+        assert finished == ["v-ok"]
+    finally:
+        ingest_worker._pool.shutdown()
+        ingest_worker._pool = None
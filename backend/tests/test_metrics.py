@@ -0,0 +1,26 @@
+# backend/tests/test_metrics.py
+import asyncio
+from starlette.responses import FileResponse
+from app.utils import metrics
+
+
+def test_pathsend_bodies_count_as_bytes_out(tmp_path):
+    path = tmp_path / "f.bin"
+    path.write_bytes(b"x" * 12345)
+    app = metrics.MetricsMiddleware(FileResponse(str(path)))
+    scope = {
+        "type": "http", "method": "GET", "path": "/pathsend-test", "headers": [],
+        "extensions": {"http.response.pathsend": {}},
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message["type"])
+
+    before = dict(metrics.BYTES_OUT._values).get(("unmatched",), 0)
+    asyncio.run(app(scope, receive, send))
+    assert sent == ["http.response.start", "http.response.pathsend"]
+    assert metrics.BYTES_OUT._values[("unmatched",)] - before == 12345
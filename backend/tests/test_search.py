@@ -0,0 +1,64 @@
+# backend/tests/test_search.py
+import zlib
+import numpy as np
+import pytest
+from app.services import search_service
+
+DIM = 64
+
+
+class HashingModel:
+    """Bag-of-words stand-in for sentence-transformers: no download."""
+
+    def get_sentence_embedding_dimension(self):
+        return DIM
+
+    def encode(self, texts, **kwargs):
+        out = np.zeros((len(texts), DIM))
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                out[i, zlib.crc32(word.encode()) % DIM] += 1
+        return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+
+
+@pytest.fixture(scope="module")
+def index():
+    search_service._model = HashingModel()
+    search_service.embed_query.cache_clear()
+
+    def add(hid, versions, text, subject="Physics"):
+        for v in range(1, versions + 1):
+            chunks = [{"page": 1, "text": f"{text} revision {v}"}]
+            payload = {"version_id": f"{hid}_v{v}", "handout_id": hid, "version": v,
+                       "subject": subject, "title": hid}
+            search_service.index_chunks(payload, chunks, search_service.embed([c["text"] for c in chunks]))
+
+    add("heat", 5, "thermodynamics entropy heat engines")
+    add("gases", 1, "thermodynamics ideal gases pressure")
+    add("cells", 1, "genetics cells enzymes", subject="Biology")
+    yield
+    search_service.close()
+    search_service._model = None
+
+
+def test_versions_of_one_handout_do_not_crowd_out_others(index):
+    hits = search_service.search("thermodynamics entropy", limit=2)
+    assert [h["handout_id"] for h in hits] == ["heat", "gases"]
+    # the handout is shown as its newest version
+    assert hits[0]["version"] == 5
+
+
+def test_limit_counts_distinct_handouts(index):
+    hits = search_service.search("thermodynamics", limit=3)
+    assert sorted(h["handout_id"] for h in hits) == ["cells", "gases", "heat"]
+    assert hits[0]["score"] >= hits[1]["score"] >= hits[2]["score"]
+
+
+def test_within_a_handout_every_version_is_a_hit(index):
+    hits = search_service.search("thermodynamics entropy", handout_id="heat", limit=10)
+    assert sorted(h["version"] for h in hits) == [1, 2, 3, 4, 5]
+
+
+def test_subject_filter(index):
+    hits = search_service.search("thermodynamics", subject="Biology", limit=5)
+    assert [h["handout_id"] for h in hits] == ["cells"]
@@ -0,0 +1,35 @@
+# backend/tests/test_thumbnail_disk.py
+import os
+import uuid
+import multiprocessing
+from app.services import thumbnail_service
+
+BUDGET = 64 * 1024
+RENDER = 4 * 1024
+
+
+def write_renders(n):
+    # one worker process: renders land and are accounted one at a time
+    for _ in range(n):
+        d = thumbnail_service.thumb_dir(uuid.uuid4().hex)
+        os.makedirs(d)
+        with open(os.path.join(d, thumbnail_service.MARKER), "wb") as f:
+            f.write(b"x" * RENDER)
+        thumbnail_service.note_written(d)
+
+
+def test_disk_budget_holds_across_workers(monkeypatch):
+    # spawned workers read the budget from the environment
+    monkeypatch.setenv("THUMB_DISK_BYTES", str(BUDGET))
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=write_renders, args=(25,)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(60)
+        assert w.exitcode == 0
+
+    on_disk = thumbnail_service._size(thumbnail_service.thumbs_root())
+    # 100 renders written, 25 fit: a per-process count would allow 4x
+    assert on_disk <= BUDGET
+    assert thumbnail_service._disk.get(thumbnail_service.DISK_BYTES) == on_disk
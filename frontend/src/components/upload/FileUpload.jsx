@@ -1,6 +1,58 @@
 import React, { useState, useRef } from "react";
 import api from "./../../services/api";
 
+const AUTH = { Authorization: "HANDOUTVAULTSECRET123" };
+
+// files above this go through the resumable session API
+const CHUNKED_THRESHOLD = 8 * 1024 * 1024;
+const PARALLEL_PARTS = 4;
+const PART_RETRIES = 3;
+
+// init -> parallel PUT of parts -> commit; each part is retried on its
+// own, so a dropped connection only re-sends that part
+async function chunkedUpload({ subject, title, file }, onProgress) {
+  const { data: session } = await api.post(
+    "/handouts/uploads",
+    { subject, title, filename: file.name, size: file.size, content_type: file.type },
+    { headers: AUTH }
+  );
+
+  const { upload_id, part_size, total_parts } = session;
+  const queue = [...session.missing];
+  let done = total_parts - queue.length;
+
+  const sendPart = async (n) => {
+    const blob = file.slice(n * part_size, (n + 1) * part_size);
+    for (let attempt = 1; ; attempt++) {
+      try {
+        await api.put(`/handouts/uploads/${upload_id}/parts/${n}`, blob, {
+          headers: { ...AUTH, "Content-Type": "application/octet-stream" },
+          timeout: 0,
+        });
+        return;
+      } catch (err) {
+        if (attempt >= PART_RETRIES) throw err;
+        await new Promise((r) => setTimeout(r, 1000 * attempt));
+      }
+    }
+  };
+
+  const worker = async () => {
+    while (queue.length) {
+      await sendPart(queue.shift());
+      done += 1;
+      onProgress(Math.round((done * 100) / total_parts));
+    }
+  };
+
+  await Promise.all(Array.from({ length: PARALLEL_PARTS }, worker));
+
+  await api.post(`/handouts/uploads/${upload_id}/commit`, null, {
+    headers: AUTH,
+    timeout: 0,
+  });
+}
+
 export default function UploadModal({ isOpen, onClose, subjects, refresh }) {
   const [subject, setSubject] = useState("");
   const [title, setTitle] = useState("");
@@ -46,18 +98,22 @@ export default function UploadModal({ isOpen, onClose, subjects, refresh }) {
 
     setUploading(true);
 
-    const form = new FormData();
-    form.append("subject", subject);
-    form.append("title", title);
-    form.append("file", file);
-
     try {
-      await api.post("/handouts/upload", form, {
-        headers: { Authorization: "HANDOUTVAULTSECRET123" },
-        onUploadProgress: (e) => {
-          setProgress(Math.round((e.loaded * 100) / e.total));
-        },
-      });
+      if (file.size > CHUNKED_THRESHOLD) {
+        await chunkedUpload({ subject, title, file }, setProgress);
+      } else {
+        const form = new FormData();
+        form.append("subject", subject);
+        form.append("title", title);
+        form.append("file", file);
+
+        await api.post("/handouts/upload", form, {
+          headers: AUTH,
+          onUploadProgress: (e) => {
+            setProgress(Math.round((e.loaded * 100) / e.total));
+          },
+        });
+      }
 
       setUploading(false);
       refresh(); // reload handouts UI
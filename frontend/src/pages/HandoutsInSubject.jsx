@@ -6,14 +6,20 @@ import api from "../services/api";
 export default function HandoutsInSubject() {
   const { subject } = useParams();
   const [handouts, setHandouts] = useState([]);
+  const [cursor, setCursor] = useState(null);
+
+  // the API pages results; X-Next-Cursor is set while more remain
+  const loadPage = async (after) => {
+    const res = await api.get(`/handouts/subject/${subject}`, {
+      headers: { Authorization: "HANDOUTVAULTSECRET123" },
+      params: { fields: "id,title,latest_version", ...(after && { cursor: after }) }
+    });
+    setHandouts((prev) => (after ? [...prev, ...res.data] : res.data));
+    setCursor(res.headers["x-next-cursor"] || null);
+  };
 
   useEffect(() => {
-    (async () => {
-      const res = await api.get(`/handouts/subject/${subject}`, {
-        headers: { Authorization: "HANDOUTVAULTSECRET123" }
-      });
-      setHandouts(res.data);
-    })();
+    loadPage(null);
   }, [subject]);
 
   return (
@@ -38,6 +44,15 @@ export default function HandoutsInSubject() {
           ))}
         </div>
       )}
+
+      {cursor && (
+        <button
+          onClick={() => loadPage(cursor)}
+          className="mt-8 px-4 py-2 bg-gray-200 rounded-lg hover:bg-gray-300 transition"
+        >
+          Load more
+        </button>
+      )}
     </div>
   );
 }
@@ -1,24 +1,54 @@
 import React, { useEffect, useState } from "react";
 import { useParams } from "react-router-dom";
-import api from "../services/api";
+import api, { getAllPages } from "../services/api";
 
 export default function SubjectDetail() {
   const { id } = useParams();
 
   const [versions, setVersions] = useState([]);
   const [selected, setSelected] = useState(null);
+  const [fullDoc, setFullDoc] = useState(false);
+  const [noImage, setNoImage] = useState(false);
+  const [signature, setSignature] = useState(null);
 
   useEffect(() => {
     (async () => {
-      const res = await api.get(`/handouts/${id}/versions`, {
+      const all = await getAllPages(`/handouts/${id}/versions`, {
         headers: { Authorization: "HANDOUTVAULTSECRET123" }
       });
 
-      setVersions(res.data);
-      if (res.data.length) setSelected(res.data[0]);
+      setVersions(all);
+      if (all.length) setSelected(all[0]);
     })();
   }, [id]);
 
+  // <img>/<iframe> cannot send the Authorization header, so their URLs
+  // carry a short-lived signature instead; renew it well before it expires
+  useEffect(() => {
+    let timer;
+    const renew = async () => {
+      const res = await api.get(`/handouts/${id}/media-signature`, {
+        headers: { Authorization: "HANDOUTVAULTSECRET123" }
+      });
+      setSignature(res.data);
+      const left = res.data.expires * 1000 - Date.now();
+      timer = setTimeout(renew, Math.max(left / 2, 30000));
+    };
+    renew();
+    return () => clearTimeout(timer);
+  }, [id]);
+
+  // start every version on its (cheap) first-page image
+  useEffect(() => {
+    setFullDoc(false);
+    setNoImage(false);
+  }, [selected?.id]);
+
+  const media = (path) =>
+    signature &&
+    `${api.defaults.baseURL}/handouts/${path}${path.includes("?") ? "&" : "?"}` +
+      `expires=${signature.expires}&sig=${signature.sig}`;
+
   const download = async (ver) => {
     const res = await api.get(`/handouts/${id}/versions/${ver.id}/download`, {
       headers: { Authorization: "HANDOUTVAULTSECRET123" },
@@ -28,7 +58,7 @@ export default function SubjectDetail() {
     const url = window.URL.createObjectURL(new Blob([res.data]));
     const a = document.createElement("a");
     a.href = url;
-    a.download = ver.file_path.split("/").pop();
+    a.download = ver.filename || ver.file_path.split("/").pop();
     a.click();
   };
 
@@ -52,7 +82,16 @@ export default function SubjectDetail() {
                   : "hover:bg-gray-100"
               }`}
             >
-              Version {v.version}
+              <div className="flex items-center gap-3">
+                <img
+                  src={media(`thumbnail/${v.id}?page=1`)}
+                  alt=""
+                  loading="lazy"
+                  className="w-10 h-14 object-cover rounded border bg-white"
+                  onError={(e) => (e.currentTarget.style.display = "none")}
+                />
+                <span>Version {v.version}</span>
+              </div>
             </li>
           ))}
         </ul>
@@ -67,12 +106,31 @@ export default function SubjectDetail() {
             </h2>
 
             <div className="bg-white border rounded-xl shadow p-4">
-              <iframe
-                src={`/handouts/preview/${selected.id}`}
-                className="w-full h-[600px] rounded-md border"
-              />
+              {fullDoc || noImage ? (
+                <iframe
+                  src={media(`preview/${selected.id}`)}
+                  className="w-full h-[600px] rounded-md border"
+                />
+              ) : (
+                <img
+                  src={media(`preview/${selected.id}/image`)}
+                  alt={`First page of v${selected.version}`}
+                  className="w-full max-h-[600px] object-contain rounded-md border cursor-pointer"
+                  onClick={() => setFullDoc(true)}
+                  onError={() => setNoImage(true)}
+                />
+              )}
             </div>
 
+            {!noImage && (
+              <button
+                onClick={() => setFullDoc(!fullDoc)}
+                className="mt-3 text-sm text-blue-600 hover:underline"
+              >
+                {fullDoc ? "Show first page only" : "Open full document"}
+              </button>
+            )}
+
             <button
               onClick={() => download(selected)}
               className="
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from "react";
-import api from "./../services/api";
+import { getAllPages } from "./../services/api";
 import { Link } from "react-router-dom";
 import UploadModal from "./../components/upload/FileUpload";
 
@@ -19,13 +19,13 @@ export default function Subjects() {
   // ---------------------------
   const loadSubjects = async () => {
     try {
-      const res = await api.get("/handouts/subjects", {
+      const all = await getAllPages("/handouts/subjects", {
         headers: { Authorization: "HANDOUTVAULTSECRET123" }
       });
 
       // backend returns: [{id:"Physics",count:3}, ...]
       const list = FIXED_SUBJECTS.map((name) => {
-        const found = res.data.find((x) => x.id === name);
+        const found = all.find((x) => x.id === name);
         return {
           id: name,
           count: found ? found.count : 0,
@@ -5,4 +5,19 @@ const api = axios.create({
   timeout: 15000
 });
 
+// listings are paged; follow X-Next-Cursor until the last page
+export const getAllPages = async (url, config = {}) => {
+  let items = [];
+  let cursor = null;
+  do {
+    const res = await api.get(url, {
+      ...config,
+      params: { ...config.params, limit: 1000, ...(cursor && { cursor }) }
+    });
+    items = items.concat(res.data);
+    cursor = res.headers["x-next-cursor"] || null;
+  } while (cursor);
+  return items;
+};
+
 export default api;